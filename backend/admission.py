@@ -0,0 +1,170 @@
+"""
+Admission control: bounded per-endpoint queues and per-client rate limits.
+
+`AdmissionQueue` runs at most `concurrency` requests at once and lets up to
+`max_waiting` more wait for a slot, lower priority numbers first (FIFO within
+a priority). When the waiting room is full, a new request pushes out the
+lowest-priority waiter if it outranks it and is refused otherwise, straight
+away and with an estimated retry delay, so overload turns into quick 503s
+instead of timeouts.
+
+`ClientLimiter` gives every client address its own token bucket so a single
+busy kiosk cannot use up the shared Gemini quota. `client_address` picks that
+address; X-Forwarded-For is only believed when it was set by a trusted proxy.
+"""
+import asyncio
+import heapq
+import ipaddress
+import itertools
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+from backend.ratelimit import TokenBucket
+
+
+class Rejected(Exception):
+    """Raised when a request is not admitted; `retry_after` is in seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class QueueFull(Rejected):
+    pass
+
+
+class RateLimited(Rejected):
+    pass
+
+
+class AdmissionQueue:
+    def __init__(self, name: str, concurrency: int, max_waiting: int):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.max_waiting = max(0, max_waiting)
+        self.running = 0
+        self.rejected = 0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._service_time = 1.0  # EWMA of seconds a slot is held, for Retry-After
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def full(self) -> bool:
+        return self.running >= self.concurrency and self.waiting >= self.max_waiting
+
+    def retry_after(self) -> float:
+        return self._service_time * (self.waiting + 1) / self.concurrency
+
+    async def acquire(self, priority: int = 0):
+        if self.running < self.concurrency and not self._waiters:
+            self.running += 1
+            return
+        if self.waiting >= self.max_waiting:
+            self._make_room(priority)
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._seq), future)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await future  # The releasing request hands its slot over (running stays the same)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release()  # Slot was handed over just as we gave up: pass it on
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+
+    def _make_room(self, priority: int):
+        worst = max(self._waiters, default=None)
+        if worst is None or worst[0] <= priority:
+            self.rejected += 1
+            raise QueueFull(f"{self.name} queue is full", self.retry_after())
+        self._waiters.remove(worst)
+        heapq.heapify(self._waiters)
+        self.rejected += 1
+        worst[2].set_exception(QueueFull(f"{self.name} queue is full", self.retry_after()))
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.running -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int = 0):
+        await self.acquire(priority)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._service_time = 0.8 * self._service_time + 0.2 * (time.monotonic() - start)
+            self.release()
+
+    def stats(self) -> dict:
+        return {"running": self.running, "waiting": self.waiting, "rejected": self.rejected}
+
+
+class ClientLimiter:
+    """Per-client token buckets (least recently seen clients are forgotten past `max_clients`)."""
+
+    def __init__(self, rate_per_minute: float, burst: float, max_clients: int = 10_000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self.limited = 0
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+
+    def check(self, client: str, cost: float = 1.0):
+        """Takes `cost` tokens (at most `burst`) from the client's bucket or raises RateLimited."""
+        if self.rate <= 0:
+            return
+        if cost > self.burst:
+            raise ValueError(f"cost {cost} exceeds the burst size {self.burst}: charge per item instead")
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.rate, self.burst)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        if not bucket.try_take(cost):
+            self.limited += 1
+            raise RateLimited(f"Rate limit exceeded for client {client}", bucket.wait_time(cost))
+
+
+def parse_networks(spec: str) -> list:
+    """Comma-separated addresses or CIDR ranges, e.g. "10.0.0.0/8, 127.0.0.1"."""
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in spec.split(",") if part.strip()]
+
+
+def _trusted(address: str, networks) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def client_address(peer: str | None, forwarded_for: str | None, trusted_proxies=()) -> str:
+    """
+    The connecting peer's address, or, when that peer is a trusted proxy, the
+    right-most X-Forwarded-For hop that is not itself a trusted proxy (hops to
+    its left were supplied by the client and can be anything).
+    """
+    if not peer:
+        return "unknown"
+    if not forwarded_for or not _trusted(peer, trusted_proxies):
+        return peer
+    hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _trusted(hop, trusted_proxies):
+            return hop
+    return hops[0] if hops else peer
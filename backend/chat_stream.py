@@ -0,0 +1,65 @@
+"""
+Helpers for the server-sent-events chat stream.
+
+The streaming prompt asks Gemini for a plain-text answer followed by a final
+`BIN: <bin>` line. `BinLineFilter` forwards the answer text as it arrives and
+holds back only what could still turn out to be that marker line.
+"""
+from backend.structured import dumps
+
+BIN_MARKER = "BIN:"
+VALID_BINS = ("Recycle", "Organic", "Hazardous", "Landfill")
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+
+def parse_bin(text: str, default: str = "Landfill") -> str:
+    for name in VALID_BINS:
+        if name.lower() in text.lower():
+            return name
+    return default
+
+
+class BinLineFilter:
+    def __init__(self):
+        self.bin_line = None
+        self._line = ""          # Current, not yet newline-terminated line
+        self._line_is_text = False  # Part of the current line was already forwarded
+        self.text = ""           # Everything forwarded so far
+
+    def _could_be_marker(self, line: str) -> bool:
+        head = line.lstrip().upper()
+        return BIN_MARKER.startswith(head) or head.startswith(BIN_MARKER)
+
+    def feed(self, chunk: str) -> str:
+        """Returns the part of `chunk` that can be shown to the user now."""
+        out = []
+        self._line += chunk
+        while "\n" in self._line:
+            line, self._line = self._line.split("\n", 1)
+            if not self._line_is_text and line.lstrip().upper().startswith(BIN_MARKER):
+                self.bin_line = line
+            else:
+                out.append(line + "\n")
+            self._line_is_text = False
+        if self._line and (self._line_is_text or not self._could_be_marker(self._line)):
+            out.append(self._line)
+            self._line = ""
+            self._line_is_text = True
+        forwarded = "".join(out)
+        self.text += forwarded
+        return forwarded
+
+    def finish(self) -> str:
+        """Flushes the last line; returns any remaining user-visible text."""
+        rest = ""
+        if self._line:
+            if not self._line_is_text and self._line.lstrip().upper().startswith(BIN_MARKER):
+                self.bin_line = self._line
+            else:
+                rest = self._line
+        self._line = ""
+        self.text += rest
+        return rest
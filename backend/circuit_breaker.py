@@ -0,0 +1,108 @@
+"""
+Circuit breaker for the Gemini backend.
+
+Closed: calls go through and their outcomes fill a rolling window. Once the
+window holds at least `min_calls` outcomes and the failure share reaches
+`failure_rate`, the breaker opens. Open: calls are refused immediately, so
+callers fall back (local detector, offline chat answer) without waiting on
+timeouts. After `open_seconds` it turns half-open and lets a single probe
+through: success closes it, failure re-opens it for twice as long (capped).
+"""
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a backend whose breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open (retry in {retry_after:.0f}s)")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_rate: float = 0.5, window: int = 20, min_calls: int = 5,
+                 open_seconds: float = 30.0, max_open_seconds: float = 300.0):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = max(1, min_calls)
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self._outcomes = deque(maxlen=max(window, self.min_calls))  # True = failure
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._open_for = open_seconds
+        self._probe_in_flight = False
+        self.opened = 0  # Times the breaker tripped
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self._open_for:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def available(self) -> bool:
+        """Whether a call would currently be let through (does not reserve the probe)."""
+        state = self.state
+        return state == CLOSED or (state == HALF_OPEN and not self._probe_in_flight)
+
+    def allow(self) -> bool:
+        """Admits a call; in half-open state only the first caller becomes the probe."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        if self._state == HALF_OPEN:
+            self._close()
+        elif self._state == CLOSED:
+            self._outcomes.append(False)
+
+    def record_failure(self):
+        if self._state == OPEN:
+            return  # A call admitted before the breaker tripped
+        if self._state == HALF_OPEN:
+            self._open(min(self.max_open_seconds, self._open_for * 2))
+            return
+        self._outcomes.append(True)
+        if len(self._outcomes) >= self.min_calls and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+            self._open(self.open_seconds)
+
+    def release(self):
+        """The admitted call ended without an outcome (e.g. cancelled): free the probe slot."""
+        if self._state == HALF_OPEN:
+            self._probe_in_flight = False
+
+    def retry_after(self) -> float:
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self._open_for - time.monotonic())
+
+    def _open(self, seconds: float):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._open_for = seconds
+        self._probe_in_flight = False
+        self.opened += 1
+
+    def _close(self):
+        self._state = CLOSED
+        self._outcomes.clear()
+        self._open_for = self.open_seconds
+        self._probe_in_flight = False
+
+    def to_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "failure_rate": round(sum(self._outcomes) / len(self._outcomes), 2) if self._outcomes else 0.0,
+            "retry_after_s": round(self.retry_after(), 1),
+        }
@@ -0,0 +1,382 @@
+"""
+Offline bulk classification of an image directory (no web server).
+
+Runs the /detect pipeline from backend/main.py (cache, Gemini and/or the local
+detector, bin mapping) in a pool of worker processes, one per usable CPU. The
+tree is walked lazily with os.scandir, results are appended to the output as
+images finish, and the output doubles as the checkpoint: running the same
+command again skips every image already in it.
+
+    python backend/classify_dir.py /data/dump results.csv
+    python backend/classify_dir.py /data/dump results.csv --local-only            # YOLO only, no Gemini quota
+    python backend/classify_dir.py /data/dump results/ --format parquet            # part files, needs pyarrow
+    python backend/classify_dir.py /data/dump results.csv --workers 4 --strategy local_first
+
+Output has one row per detected item (images with no items get a single row
+with empty item fields). Images whose classification raised an error (e.g.
+the file could not be read) are left out of the output, so the next run
+retries them. Workers refuse to start, and the run exits non-zero, when
+neither Gemini nor the local detector comes up; once one is ready, an empty
+result means the image really shows nothing we detect. A summary of item and bin counts over
+the whole output is printed at the end and written next to it as JSON.
+"""
+import argparse
+import asyncio
+import csv
+import glob
+import json
+import os
+import signal
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.inference import available_cpus
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+PROGRESS_EVERY = 500
+COLUMNS = ["path", "item_id", "item_type", "bin", "contaminated", "confidence", "x", "y", "w", "h", "source", "error"]
+
+
+def iter_images(root: str):
+    """Yields image paths relative to `root`, depth first, one directory listing at a time."""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.name.lower().endswith(IMAGE_SUFFIXES):
+                        yield os.path.relpath(entry.path, root)
+        except OSError as e:
+            print(f"⚠️ Skipping {directory}: {e}", file=sys.stderr)
+        stack.extend(sorted(subdirs, reverse=True))
+
+
+def chunked(iterable, size: int):
+    chunk = []
+    for value in iterable:
+        chunk.append(value)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ─────────────────────────────────────────────────────────────
+# Worker processes
+# ─────────────────────────────────────────────────────────────
+_main = None
+_loop = None
+
+
+def init_worker(verbose: bool):
+    """Imports the app module and warms up its backends once per worker process."""
+    global _main, _loop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C is handled by the parent
+    if not verbose:
+        sys.stdout = open(os.devnull, "w")  # main.py prints a line per detection
+    from backend import main
+
+    _main = main
+    _loop = asyncio.new_event_loop()
+    _loop.run_until_complete(main.warm_up())
+    if not (main.yolo_status.ready or main.gemini_status.ready):
+        # Every image would come back unclassified: fail the pool instead
+        message = f"No detection backend is ready (gemini: {main.gemini_status.to_dict()}, yolo: {main.yolo_status.to_dict()})"
+        print(f"❌ {message}", file=sys.stderr)
+        raise RuntimeError(message)
+
+
+def classify_chunk(root: str, paths: list[str]) -> list[tuple[str, list[dict]]]:
+    return _loop.run_until_complete(classify_all(root, paths))
+
+
+async def classify_all(root: str, paths: list[str]):
+    # Images of a chunk run concurrently: Gemini calls overlap and YOLO gets batched
+    return await asyncio.gather(*(classify_one(root, path) for path in paths))
+
+
+def read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def classify_one(root: str, path: str) -> tuple[str, list[dict]]:
+    try:
+        data = await asyncio.to_thread(read_file, os.path.join(root, path))
+        response = await _main.run_detection(data, path)
+    except Exception as e:
+        return path, [empty_row(path, error=str(e))]
+    if not response.items:
+        return path, [empty_row(path, source=response.source)]
+    return path, [
+        {
+            "path": path, "item_id": item.id, "item_type": item.itemType, "bin": item.bin,
+            "contaminated": item.contaminated, "confidence": round(item.confidence, 4),
+            "x": item.bbox.x, "y": item.bbox.y, "w": item.bbox.w, "h": item.bbox.h,
+            "source": response.source, "error": "",
+        }
+        for item in response.items
+    ]
+
+
+def empty_row(path: str, source: str = "none", error: str = "") -> dict:
+    return {**dict.fromkeys(COLUMNS, ""), "path": path, "source": source, "error": error}
+
+
+def failed(rows: list[dict]) -> bool:
+    """
+    Classification raised an error: never checkpointed, retried next run. An
+    empty result (source "none" included: the pipeline reports that when its
+    backends found nothing) is a real answer and is checkpointed.
+    """
+    return bool(rows[0]["error"])
+
+
+# ─────────────────────────────────────────────────────────────
+# Output sinks (append-only; existing rows are the checkpoint)
+# ─────────────────────────────────────────────────────────────
+class CsvSink:
+    def __init__(self, path: str, overwrite: bool):
+        self.path = path
+        if overwrite and os.path.exists(path):
+            os.remove(path)
+        self.summary_path = path + ".summary.json"
+
+    def existing_rows(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, newline="") as f:
+            return list(csv.DictReader(f))
+
+    def open(self):
+        new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, "a", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=COLUMNS)
+        if new:
+            self._writer.writeheader()
+
+    def write(self, rows: list[dict]):
+        self._writer.writerows(rows)
+        self._file.flush()  # A crash loses at most the image being written
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetSink:
+    """A directory of part files; buffered rows are written every `flush_rows` rows."""
+
+    def __init__(self, path: str, overwrite: bool, flush_rows: int = 5000):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            sys.exit("❌ --format parquet needs pyarrow (pip install pyarrow)")
+        self.pa, self.pq = pyarrow, pyarrow.parquet
+        self.path = path
+        self.flush_rows = flush_rows
+        os.makedirs(path, exist_ok=True)
+        if overwrite:
+            for part in glob.glob(os.path.join(path, "part-*.parquet")):
+                os.remove(part)
+        self.summary_path = os.path.join(path, "summary.json")
+        self._buffer = []
+
+    def _parts(self):
+        return sorted(glob.glob(os.path.join(self.path, "part-*.parquet")))
+
+    def existing_rows(self):
+        rows = []
+        for part in self._parts():
+            rows.extend(self.pq.read_table(part).to_pylist())
+        return rows
+
+    def open(self):
+        parts = self._parts()
+        self._next_part = int(os.path.basename(parts[-1])[5:10]) + 1 if parts else 0
+
+    def write(self, rows: list[dict]):
+        self._buffer.extend(rows)
+        if len(self._buffer) >= self.flush_rows:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        table = self.pa.Table.from_pylist([{c: str(row[c]) for c in COLUMNS} for row in self._buffer])
+        # Write then rename, so a crash never leaves a half-written part behind
+        final = os.path.join(self.path, f"part-{self._next_part:05d}.parquet")
+        self.pq.write_table(table, final + ".tmp")
+        os.replace(final + ".tmp", final)
+        self._next_part += 1
+        self._buffer = []
+
+    def close(self):
+        self._flush()
+
+
+# ─────────────────────────────────────────────────────────────
+# Summary
+# ─────────────────────────────────────────────────────────────
+class Summary:
+    def __init__(self):
+        self.images = 0
+        self.errors = 0
+        self.items = Counter()
+        self.bins = Counter()
+        self.sources = Counter()
+
+    def add(self, rows: list[dict]):
+        self.images += 1
+        self.sources[rows[0]["source"]] += 1
+        if rows[0]["error"]:
+            self.errors += 1
+        for row in rows:
+            if row["item_type"]:
+                self.items[row["item_type"]] += 1
+                self.bins[row["bin"]] += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "images": self.images,
+            "errors": self.errors,
+            "items": sum(self.items.values()),
+            "bins": dict(self.bins.most_common()),
+            "item_types": dict(self.items.most_common()),
+            "sources": dict(self.sources.most_common()),
+        }
+
+    def print(self, top: int = 15):
+        print(f"\n📊 {self.images} images, {sum(self.items.values())} items, {self.errors} errors")
+        print("Bins:")
+        for name, count in self.bins.most_common():
+            print(f"  {name:<12} {count:>8}")
+        print("Top item types:")
+        for name, count in self.items.most_common(top):
+            print(f"  {name:<24} {count:>8}")
+        print("Served by: " + ", ".join(f"{name} {count}" for name, count in self.sources.most_common()))
+
+
+def restore(sink) -> tuple[set[str], Summary]:
+    """Paths already classified and the summary of the rows written for them."""
+    by_path = {}
+    for row in sink.existing_rows():
+        by_path.setdefault(row["path"], []).append(row)
+    summary = Summary()
+    for rows in by_path.values():
+        summary.add(rows)
+    return set(by_path), summary
+
+
+def configure_environment(args):
+    """Settings read by backend.main at import time, i.e. in the worker processes."""
+    os.environ.setdefault("DETECTOR_THREADS", "1")  # One process per core already
+    os.environ["DETECT_ENRICHMENT"] = "inline"  # Nobody polls /enrich offline
+    os.environ["DETECT_CACHE_MATCH"] = "exact"  # A near-duplicate hit would copy another image's items
+    if args.local_only:
+        os.environ["GEMINI_API_KEY"] = ""
+    if args.strategy:
+        os.environ["DETECT_STRATEGY"] = args.strategy
+    if "KEY_STATE_DB" not in os.environ:
+        # Gemini key cooldowns are shared between the workers, fresh for every run
+        os.environ["KEY_STATE_DB"] = os.path.join(tempfile.gettempdir(), f"waste-segregate-classify-{os.getpid()}.sqlite")
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(os.environ["KEY_STATE_DB"] + suffix)
+            except FileNotFoundError:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", help="Directory to classify (walked recursively)")
+    parser.add_argument("output", help="CSV file, or directory of part files for --format parquet")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--workers", type=int, default=available_cpus(), help="Worker processes (default: usable CPUs)")
+    parser.add_argument("--chunk-size", type=int, default=8, help="Images per task; they run concurrently in a worker")
+    parser.add_argument("--strategy", choices=["gemini_first", "hedged", "local_first"], help="Overrides DETECT_STRATEGY")
+    parser.add_argument("--local-only", action="store_true", help="Never call Gemini (local detector only)")
+    parser.add_argument("--overwrite", action="store_true", help="Start over instead of resuming from the output")
+    parser.add_argument("--limit", type=int, help="Stop after this many new images")
+    parser.add_argument("--verbose", action="store_true", help="Keep the per-detection output of the workers")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        sys.exit(f"❌ Not a directory: {args.root}")
+    configure_environment(args)
+
+    sink = ParquetSink(args.output, args.overwrite) if args.format == "parquet" else CsvSink(args.output, args.overwrite)
+    done, summary = restore(sink)
+    if done:
+        print(f"↩️ Resuming: {len(done)} images already in {args.output}")
+
+    todo = (path for path in iter_images(args.root) if path not in done)
+    if args.limit:
+        todo = (path for _, path in zip(range(args.limit), todo))
+    workers = max(1, args.workers)
+    print(f"🚀 Classifying {args.root} with {workers} worker processes")
+
+    sink.open()
+    start = time.perf_counter()
+    processed = 0
+    failures = 0
+    pending = set()
+
+    def collect():
+        nonlocal pending, processed, failures
+        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in finished:
+            for path, rows in future.result():
+                if failed(rows):
+                    failures += 1
+                    print(f"⚠️ {path}: {rows[0]['error']}", file=sys.stderr)
+                    continue
+                sink.write(rows)
+                summary.add(rows)
+                processed += 1
+                if processed % PROGRESS_EVERY == 0:
+                    rate = processed / (time.perf_counter() - start)
+                    print(f"… {processed} images ({rate:.1f}/s)", file=sys.stderr)
+
+    try:
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(args.verbose,)) as pool:
+            try:
+                # Bounded number of tasks in flight: the walk stays lazy however big the tree is
+                for chunk in chunked(todo, max(1, args.chunk_size)):
+                    pending.add(pool.submit(classify_chunk, args.root, chunk))
+                    if len(pending) >= workers * 2:
+                        collect()
+                while pending:
+                    collect()
+            except KeyboardInterrupt:
+                print("\n⏹️ Interrupted, rerun the same command to resume", file=sys.stderr)
+                for future in pending:
+                    future.cancel()  # Chunks already running finish, unwritten; they are redone on resume
+    except BrokenProcessPool:
+        sys.exit("❌ Worker processes failed to start, see the errors above")
+    finally:
+        sink.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ {processed} new images in {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.1f}/s)")
+    summary.print()
+    with open(sink.summary_path, "w") as f:
+        json.dump(summary.to_dict(), f, indent=2)
+    if failures:
+        sys.exit(f"⚠️ {failures} images could not be classified; rerun the same command to retry them")
+
+
+if __name__ == "__main__":
+    main()
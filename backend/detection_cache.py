@@ -0,0 +1,103 @@
+"""
+Content-addressed detection cache.
+
+Results are keyed by an integer hash of the image. By default that is the
+sha256 of the upload, so only byte-identical scans hit. Optionally it is a
+perceptual difference hash (dHash) of the decoded image and lookups accept a
+small Hamming distance, so re-encoded JPEGs of the same scene hit too; the
+price is that a different item on the same fixed background can come within
+the distance and be served the first item's result.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+
+from PIL import Image
+
+
+def content_key(data: bytes) -> int:
+    """Exact key: the sha256 of the upload as an integer."""
+    return int.from_bytes(hashlib.sha256(data).digest(), "big")
+
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """hash_size² bit difference hash: compares adjacent pixels of a tiny grayscale copy."""
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+class DetectionCache:
+    """
+    LRU + TTL cache of detection responses keyed by an integer hash.
+    `max_distance` is the Hamming tolerance (0: exact match only);
+    `max_bytes` caps the (approximate) serialized size of everything held.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 8 * 1024 * 1024,
+                 ttl_seconds: float = 600.0, max_distance: int = 0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self.max_distance = max_distance
+        self._entries: OrderedDict[int, tuple[float, int, object]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _find(self, key: int):
+        if key in self._entries:
+            return key
+        if self.max_distance <= 0:
+            return None
+        best, best_distance = None, self.max_distance + 1
+        for other in self._entries:
+            distance = (key ^ other).bit_count()
+            if distance < best_distance:
+                best, best_distance = other, distance
+        return best
+
+    def _evict(self, key: int):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: int):
+        match = self._find(key)
+        if match is not None:
+            expires_at, _, value = self._entries[match]
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(match)
+                self.hits += 1
+                return value
+            self._evict(match)
+        self.misses += 1
+        return None
+
+    def put(self, key: int, value):
+        size = len(value.model_dump_json())
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (time.monotonic() + self.ttl, size, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,208 @@
+"""
+Pluggable local detector backends.
+
+Every backend exposes `names` (class id -> class name) and
+`predict(images) -> list[Detections]`, returning plain NumPy arrays in the
+input image's pixel coordinates so the API layer does not care which engine
+produced them.
+
+- `UltralyticsDetector`: the original YOLOv8 `.pt` path (needs torch).
+- `OnnxDetector`: an exported YOLOv8 ONNX graph (optionally int8-quantized)
+  on ONNX Runtime, with its own letterbox preprocessing and NMS. No torch or
+  ultralytics at runtime. Create the model files with `backend/export_onnx.py`.
+"""
+import ast
+import os
+from dataclasses import dataclass
+
+import numpy as np
+from PIL import Image
+
+BASE_DIR = os.path.dirname(__file__)
+
+COCO_NAMES = [
+    "person", "bicycle", "car", "motorcycle", "airplane", "bus", "train", "truck", "boat",
+    "traffic light", "fire hydrant", "stop sign", "parking meter", "bench", "bird", "cat", "dog",
+    "horse", "sheep", "cow", "elephant", "bear", "zebra", "giraffe", "backpack", "umbrella",
+    "handbag", "tie", "suitcase", "frisbee", "skis", "snowboard", "sports ball", "kite",
+    "baseball bat", "baseball glove", "skateboard", "surfboard", "tennis racket", "bottle",
+    "wine glass", "cup", "fork", "knife", "spoon", "bowl", "banana", "apple", "sandwich", "orange",
+    "broccoli", "carrot", "hot dog", "pizza", "donut", "cake", "chair", "couch", "potted plant",
+    "bed", "dining table", "toilet", "tv", "laptop", "mouse", "remote", "keyboard", "cell phone",
+    "microwave", "oven", "toaster", "sink", "refrigerator", "book", "clock", "vase", "scissors",
+    "teddy bear", "hair drier", "toothbrush",
+]
+
+
+@dataclass
+class Detections:
+    boxes: np.ndarray      # (N, 4) float32 x1, y1, x2, y2
+    scores: np.ndarray     # (N,) float32
+    class_ids: np.ndarray  # (N,) int64
+
+    def __len__(self):
+        return len(self.scores)
+
+
+@dataclass
+class ClassInfo:
+    name: str
+    bin: str
+    contaminated: bool
+    metadata: dict
+
+
+class ClassTable:
+    """
+    Per-class facts resolved once when a model loads: class id -> ClassInfo,
+    plus a boolean array of classes to report (people etc. are filtered out).
+    `select()` then filters and ranks whole Detections arrays at once.
+    """
+
+    def __init__(self, infos: list[ClassInfo], keep: np.ndarray):
+        self.infos = infos
+        self.keep = keep
+
+    @classmethod
+    def build(cls, names, describe, excluded=()):
+        """`names`: class id -> name (dict or list); `describe(name)` returns its ClassInfo."""
+        if not isinstance(names, dict):
+            names = dict(enumerate(names))
+        size = max(names, default=-1) + 1
+        infos = [describe(names.get(i, f"class {i}")) for i in range(size)]
+        keep = np.array([i in names and names[i].lower() not in excluded for i in range(size)], dtype=bool)
+        return cls(infos, keep)
+
+    def select(self, detections: Detections, conf_threshold: float, top_k: int) -> np.ndarray:
+        """Indices of the `top_k` best reportable detections above the threshold, best first."""
+        ids = detections.class_ids
+        known = (ids >= 0) & (ids < len(self.keep))
+        mask = known & (detections.scores >= conf_threshold)
+        mask &= self.keep[np.where(known, ids, 0)]
+        idx = np.flatnonzero(mask)
+        if len(idx) > top_k:
+            idx = idx[np.argpartition(-detections.scores[idx], top_k - 1)[:top_k]]
+        return idx[np.argsort(-detections.scores[idx], kind="stable")]
+
+
+class UltralyticsDetector:
+    backend = "ultralytics"
+
+    def __init__(self, weights_path: str):
+        from ultralytics import YOLO
+        self.model = YOLO(weights_path)
+        self.names = self.model.names
+
+    def predict(self, images: list[Image.Image]) -> list[Detections]:
+        results = self.model(images, device="cpu", verbose=False)
+        return [
+            Detections(
+                boxes=r.boxes.xyxy.cpu().numpy(),
+                scores=r.boxes.conf.cpu().numpy(),
+                class_ids=r.boxes.cls.cpu().numpy().astype(np.int64),
+            )
+            for r in results
+        ]
+
+
+def letterbox(image: Image.Image, size: int) -> tuple[np.ndarray, float, tuple[int, int]]:
+    """Resizes keeping aspect ratio and pads to `size` x `size` (YOLO gray 114)."""
+    ratio = min(size / image.width, size / image.height)
+    new_w, new_h = round(image.width * ratio), round(image.height * ratio)
+    if (new_w, new_h) != image.size:
+        image = image.resize((new_w, new_h), Image.BILINEAR)
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = np.asarray(image.convert("RGB"))
+    return canvas, ratio, (pad_x, pad_y)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Greedy non-maximum suppression; returns kept indices by descending score."""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        h = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+class OnnxDetector:
+    backend = "onnx"
+
+    def __init__(self, model_path: str, conf_threshold: float = 0.25, iou_threshold: float = 0.45,
+                 max_detections: int = 100, threads: int = 0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_size = int(model_input.shape[2]) if isinstance(model_input.shape[2], int) else 640
+        # Exports with dynamic=True accept any batch size; static graphs take one image at a time
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.max_detections = max_detections
+
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(meta["names"]) if "names" in meta else dict(enumerate(COCO_NAMES))
+
+    def _postprocess(self, output: np.ndarray, ratio: float, pad: tuple[int, int], size: tuple[int, int]) -> Detections:
+        # output: (4 + num_classes, anchors) -> (anchors, 4 + num_classes)
+        preds = output.T
+        class_scores = preds[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+        mask = scores >= self.conf_threshold
+        preds, scores, class_ids = preds[mask], scores[mask], class_ids[mask]
+
+        cx, cy, w, h = preds[:, 0], preds[:, 1], preds[:, 2], preds[:, 3]
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+
+        # Class-aware NMS in one pass: shift each class into its own coordinate range
+        offsets = class_ids[:, None].astype(np.float32) * (self.input_size + 1)
+        keep = nms(boxes + offsets, scores, self.iou_threshold)[:self.max_detections]
+        boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+
+        # Undo letterbox
+        boxes -= np.array([pad[0], pad[1], pad[0], pad[1]], dtype=np.float32)
+        boxes /= ratio
+        np.clip(boxes, 0, [size[0], size[1], size[0], size[1]], out=boxes)
+        return Detections(boxes.astype(np.float32), scores.astype(np.float32), class_ids.astype(np.int64))
+
+    def predict(self, images: list[Image.Image]) -> list[Detections]:
+        prepared = [letterbox(img, self.input_size) for img in images]
+        tensors = [
+            np.ascontiguousarray(canvas.transpose(2, 0, 1), dtype=np.float32)[None] / 255.0
+            for canvas, _, _ in prepared
+        ]
+        if self.dynamic_batch:
+            outputs = list(self.session.run(None, {self.input_name: np.concatenate(tensors)})[0])
+        else:
+            outputs = [self.session.run(None, {self.input_name: t})[0][0] for t in tensors]
+        return [
+            self._postprocess(output, ratio, pad, img.size)
+            for output, img, (_, ratio, pad) in zip(outputs, images, prepared)
+        ]
+
+
+def load_detector(backend: str, int8: bool = False, onnx_path: str | None = None, threads: int = 0):
+    """Builds the configured detector. Slow (imports the runtime, loads weights): run in a thread."""
+    if backend == "onnx":
+        default_name = "yolov8n.int8.onnx" if int8 else "yolov8n.onnx"
+        return OnnxDetector(onnx_path or os.path.join(BASE_DIR, default_name), threads=threads)
+    if backend == "ultralytics":
+        return UltralyticsDetector(os.path.join(BASE_DIR, "yolov8n.pt"))
+    raise ValueError(f"Unknown DETECTOR_BACKEND '{backend}' (expected 'ultralytics' or 'onnx')")
@@ -0,0 +1,74 @@
+"""
+Deferred item enrichment jobs.
+
+In two-phase detection mode /detect answers with bins, confidences and boxes
+only. The educational metadata is generated by a background job whose id is
+returned with the detection; clients fetch the result from GET /enrich/{id}.
+Jobs are kept in this process's memory for `ttl_seconds` (bounded by
+`max_jobs`), which is why deferred mode is limited to a single worker.
+"""
+import asyncio
+import logging
+import secrets
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+
+
+class EnrichmentJob:
+    def __init__(self, task: asyncio.Task, expires_at: float):
+        self.task = task
+        self.expires_at = expires_at
+        self.status = PENDING
+        self.result = None
+        self.error = ""
+
+
+class EnrichmentJobs:
+    def __init__(self, max_jobs: int = 1024, ttl_seconds: float = 600.0):
+        self.max_jobs = max_jobs
+        self.ttl = ttl_seconds
+        self._jobs: OrderedDict[str, EnrichmentJob] = OrderedDict()
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def submit(self, fn) -> str:
+        """Starts `fn()` (a coroutine function) in the background; returns the job id."""
+        job_id = secrets.token_urlsafe(12)
+        job = EnrichmentJob(asyncio.create_task(fn()), time.monotonic() + self.ttl)
+        job.task.add_done_callback(lambda task, j=job, i=job_id: self._finish(i, j, task))
+        self._jobs[job_id] = job
+        while len(self._jobs) > self.max_jobs:
+            self._evict(next(iter(self._jobs)))
+        return job_id
+
+    def _finish(self, job_id: str, job: EnrichmentJob, task: asyncio.Task):
+        if task.cancelled():
+            job.status, job.error = FAILED, "cancelled"
+        elif task.exception() is not None:
+            job.status, job.error = FAILED, str(task.exception())
+            logger.error(f"Enrichment {job_id} failed: {job.error}")
+        else:
+            job.status, job.result = READY, task.result()
+
+    def _evict(self, job_id: str):
+        job = self._jobs.pop(job_id)
+        if not job.task.done():
+            job.task.cancel()
+
+    def get(self, job_id: str) -> EnrichmentJob | None:
+        job = self._jobs.get(job_id)
+        if job is not None and job.expires_at <= time.monotonic():
+            self._evict(job_id)
+            return None
+        return job
+
+    async def aclose(self):
+        for job_id in list(self._jobs):
+            self._evict(job_id)
@@ -0,0 +1,79 @@
+"""
+Export yolov8n to ONNX (and optionally an int8 variant) for DETECTOR_BACKEND=onnx.
+
+Run once on a machine that has ultralytics installed; the server then only
+needs onnxruntime:
+
+    python backend/export_onnx.py                        # yolov8n.onnx
+    python backend/export_onnx.py --int8                 # + yolov8n.int8.onnx (dynamic quantization)
+    python backend/export_onnx.py --int8 --calib imgs/   # + static quantization calibrated on imgs/
+"""
+import argparse
+import os
+import sys
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.detectors import BASE_DIR, letterbox
+
+
+class _CalibrationReader:
+    """Feeds letterboxed images from a directory to the static quantizer."""
+
+    def __init__(self, input_name: str, image_dir: str, size: int, limit: int):
+        from PIL import Image
+        import numpy as np
+
+        paths = sorted(
+            os.path.join(image_dir, f) for f in os.listdir(image_dir)
+            if f.lower().endswith((".jpg", ".jpeg", ".png"))
+        )[:limit]
+        self._batches = iter(
+            {input_name: (np.ascontiguousarray(letterbox(Image.open(p), size)[0].transpose(2, 0, 1), dtype=np.float32)[None] / 255.0)}
+            for p in paths
+        )
+
+    def get_next(self):
+        return next(self._batches, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--dynamic", action="store_true", help="Dynamic batch axis (enables batched ONNX inference)")
+    parser.add_argument("--int8", action="store_true", help="Also write yolov8n.int8.onnx")
+    parser.add_argument("--calib", help="Directory of sample images for static int8 calibration")
+    parser.add_argument("--calib-limit", type=int, default=200)
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+
+    weights = os.path.join(BASE_DIR, "yolov8n.pt")
+    onnx_path = YOLO(weights).export(format="onnx", imgsz=args.imgsz, dynamic=args.dynamic, simplify=True)
+    print(f"✅ Exported {onnx_path}")
+
+    if not args.int8:
+        return
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+    import onnxruntime as ort
+
+    int8_path = os.path.join(BASE_DIR, "yolov8n.int8.onnx")
+    prepped_path = os.path.join(BASE_DIR, "yolov8n.prep.onnx")
+    quant_pre_process(onnx_path, prepped_path)
+    try:
+        if args.calib:
+            input_name = ort.InferenceSession(prepped_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+            reader = _CalibrationReader(input_name, args.calib, args.imgsz, args.calib_limit)
+            quantize_static(prepped_path, int8_path, reader, weight_type=QuantType.QInt8, activation_type=QuantType.QUInt8)
+        else:
+            quantize_dynamic(prepped_path, int8_path, weight_type=QuantType.QUInt8)
+    finally:
+        os.remove(prepped_path)
+    print(f"✅ Quantized {int8_path}")
+
+
+if __name__ == "__main__":
+    main()
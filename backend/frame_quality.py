@@ -0,0 +1,95 @@
+"""
+Cheap frame-quality gate run before any model call.
+
+Works on a small grayscale copy of the upload: frames that are too dark or
+washed out, flat (covered lens, blank wall) or blurred (low variance of the
+Laplacian) are rejected.
+
+Repeats are not rejected: after a frame has been served, `remember()` keeps
+its result, and `recent_result()` hands that result back for a near-copy
+(mean absolute difference of tiny thumbnails) from the same client within
+`duplicate_window_s`. A frame whose request failed is never remembered, so
+retrying it runs the models again.
+"""
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+from PIL import Image
+
+TOO_DARK = "too_dark"
+TOO_BRIGHT = "too_bright"
+BLANK = "blank"
+BLURRY = "blurry"
+
+DUPLICATE_THUMB_SIZE = 32
+
+
+def laplacian_variance(gray: np.ndarray) -> float:
+    """Variance of the 4-neighbour Laplacian: low values mean few edges, i.e. blur."""
+    lap = (gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]) - 4 * gray[1:-1, 1:-1]
+    return float(lap.var())
+
+
+class FrameGate:
+    def __init__(self, min_brightness: float = 20, max_brightness: float = 240, min_contrast: float = 8,
+                 min_sharpness: float = 20, duplicate_mad: float = 2.0, duplicate_window_s: float = 3.0,
+                 history: int = 4, max_clients: int = 10_000):
+        self.min_brightness = min_brightness
+        self.max_brightness = max_brightness
+        self.min_contrast = min_contrast
+        self.min_sharpness = min_sharpness
+        self.duplicate_mad = duplicate_mad
+        self.duplicate_window_s = duplicate_window_s
+        self.history = history
+        self.max_clients = max_clients
+        self._recent: OrderedDict[str, deque] = OrderedDict()  # client -> (time, thumbnail, result)
+
+    def check(self, image: Image.Image) -> str | None:
+        """Reason to reject `image` (a small decode, see preprocess.decode_thumbnail), or None."""
+        gray = np.asarray(image.convert("L"), dtype=np.float32)
+        brightness = gray.mean()
+        if brightness < self.min_brightness:
+            return TOO_DARK
+        if brightness > self.max_brightness:
+            return TOO_BRIGHT
+        if gray.std() < self.min_contrast:
+            return BLANK
+        if laplacian_variance(gray) < self.min_sharpness:
+            return BLURRY
+        return None
+
+    @staticmethod
+    def _thumb(image: Image.Image) -> np.ndarray:
+        return np.asarray(
+            image.convert("L").resize((DUPLICATE_THUMB_SIZE, DUPLICATE_THUMB_SIZE), Image.BILINEAR),
+            dtype=np.float32,
+        )
+
+    def recent_result(self, client: str, image: Image.Image):
+        """The remembered result of a near-copy of `image` from `client`, or None."""
+        recent = self._recent.get(client)
+        if self.duplicate_mad <= 0 or not recent:
+            return None
+        thumb = self._thumb(image)
+        now = time.monotonic()
+        for seen, previous, result in reversed(recent):
+            if now - seen <= self.duplicate_window_s and np.abs(thumb - previous).mean() < self.duplicate_mad:
+                return result
+        return None
+
+    def remember(self, client: str, image: Image.Image, result):
+        """Records a frame that was served successfully, with its result."""
+        if self.duplicate_mad <= 0:
+            return
+        recent = self._recent.get(client)
+        if recent is None:
+            recent = self._recent[client] = deque(maxlen=self.history)
+            while len(self._recent) > self.max_clients:
+                self._recent.popitem(last=False)
+        else:
+            self._recent.move_to_end(client)
+        recent.append((time.monotonic(), self._thumb(image), result))
+
+    def forget(self, client: str):
+        self._recent.pop(client, None)
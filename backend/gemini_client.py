@@ -0,0 +1,213 @@
+"""
+Async Gemini transport.
+
+Talks to the Generative Language REST API directly over a shared, keep-alive
+httpx connection pool. Every API key gets its own lightweight client that sends
+the key as a request header, so nothing depends on the process-global
+`genai.configure(api_key=...)` state and concurrent requests can use different
+keys safely.
+"""
+import asyncio
+import base64
+import io
+import os
+
+import httpx
+from PIL import Image
+
+from backend.structured import dumps, loads
+
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+
+# Preference order for modern models
+MODEL_PREFERENCES = [
+    'models/gemini-1.5-flash',
+    'models/gemini-1.5-pro',
+    'models/gemini-pro',
+    'models/gemini-2.0-flash-exp'
+]
+DEFAULT_MODEL = 'models/gemini-1.5-flash'
+
+
+class GeminiError(Exception):
+    """Raised when the Gemini API returns an error or an unusable response."""
+
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def classify_error(exc: Exception) -> str:
+    """
+    Buckets a Gemini failure for the key scheduler:
+    'rate_limited', 'invalid_key', 'model_not_found' or 'transient'.
+    """
+    status = getattr(exc, "status_code", None)
+    err_str = str(exc).lower()
+    if status == 429 or any(x in err_str for x in ["429", "quota", "exhausted"]):
+        return "rate_limited"
+    if status == 403 or any(x in err_str for x in ["403", "forbidden", "permission", "api key not valid", "api_key_invalid"]):
+        return "invalid_key"
+    if status == 404 or "not found" in err_str:
+        return "model_not_found"
+    return "transient"
+
+
+def select_model(model_names: list[str]) -> str:
+    """Picks the preferred model out of the ones a key can use."""
+    for pref in MODEL_PREFERENCES:
+        if pref in model_names:
+            return pref
+
+    # Last resort fallback: any model with 'gemini' in its name
+    for name in model_names:
+        if 'gemini' in name.lower():
+            return name
+
+    return DEFAULT_MODEL
+
+
+def _image_part(image) -> dict:
+    """Encodes a PIL image (or ready-made JPEG bytes) as an inline data part."""
+    if isinstance(image, Image.Image):
+        buf = io.BytesIO()
+        image.save(buf, format="JPEG", quality=90)
+        image = buf.getvalue()
+    return {"inline_data": {"mime_type": "image/jpeg", "data": base64.b64encode(image).decode("ascii")}}
+
+
+def build_contents(prompt_data) -> list[dict]:
+    """
+    Converts a prompt into REST `contents`.
+    prompt_data can be a string (for chat) or a list of strings and images
+    (PIL images or JPEG bytes) for detection.
+    """
+    if isinstance(prompt_data, str):
+        prompt_data = [prompt_data]
+
+    parts = []
+    for chunk in prompt_data:
+        if isinstance(chunk, str):
+            parts.append({"text": chunk})
+        else:
+            parts.append(_image_part(chunk))
+    return [{"role": "user", "parts": parts}]
+
+
+def _error_from_response(response: httpx.Response) -> GeminiError:
+    try:
+        detail = response.json().get("error", {})
+        message = detail.get("message") or response.text
+        status = detail.get("status", "")
+    except ValueError:
+        message, status = response.text, ""
+    return GeminiError(f"{response.status_code} {status} {message}".strip(), status_code=response.status_code)
+
+
+def _response_text(payload: dict) -> str:
+    candidates = payload.get("candidates") or []
+    if not candidates:
+        feedback = payload.get("promptFeedback", {})
+        raise GeminiError(f"Gemini returned no candidates (feedback: {feedback})")
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(p.get("text", "") for p in parts)
+
+
+class GeminiKeyClient:
+    """A single API key bound to the shared connection pool."""
+
+    def __init__(self, index: int, key: str, http: httpx.AsyncClient, limiter: asyncio.Semaphore):
+        self.index = index
+        self._headers = {"x-goog-api-key": key, "Content-Type": "application/json"}
+        self._http = http
+        self._limiter = limiter
+
+    async def list_models(self) -> list[str]:
+        """Lists the models this key may call `generateContent` on."""
+        names = []
+        page_token = None
+        while True:
+            params = {"pageSize": 1000}
+            if page_token:
+                params["pageToken"] = page_token
+            async with self._limiter:
+                response = await self._http.get(f"{GEMINI_API_BASE}/models", params=params, headers=self._headers)
+            if response.status_code != 200:
+                raise _error_from_response(response)
+            payload = response.json()
+            for m in payload.get("models", []):
+                if 'generateContent' in m.get("supportedGenerationMethods", []):
+                    names.append(m["name"])
+            page_token = payload.get("nextPageToken")
+            if not page_token:
+                return names
+
+    async def generate(self, model: str, prompt_data, generation_config: dict | None = None) -> str:
+        """Runs `generateContent` and returns the response text."""
+        # JPEG encoding is CPU work, keep it off the event loop
+        contents = await asyncio.to_thread(build_contents, prompt_data)
+        body = {"contents": contents}
+        if generation_config:
+            body["generationConfig"] = generation_config
+        async with self._limiter:
+            response = await self._http.post(
+                f"{GEMINI_API_BASE}/{model}:generateContent", content=dumps(body), headers=self._headers
+            )
+        if response.status_code != 200:
+            raise _error_from_response(response)
+        return _response_text(loads(response.content))
+
+    async def stream(self, model: str, prompt_data, generation_config: dict | None = None):
+        """Runs `streamGenerateContent` (server-sent events) and yields text chunks as they arrive."""
+        contents = await asyncio.to_thread(build_contents, prompt_data)
+        body = {"contents": contents}
+        if generation_config:
+            body["generationConfig"] = generation_config
+        async with self._limiter:
+            async with self._http.stream(
+                "POST", f"{GEMINI_API_BASE}/{model}:streamGenerateContent",
+                params={"alt": "sse"}, content=dumps(body), headers=self._headers,
+            ) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise _error_from_response(response)
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    payload = loads(line[5:])
+                    if "error" in payload:
+                        raise GeminiError(str(payload["error"].get("message", payload["error"])))
+                    if not payload.get("candidates") and not payload.get("promptFeedback", {}).get("blockReason"):
+                        continue  # e.g. a trailing usage-metadata-only chunk
+                    text = _response_text(payload)
+                    if text:
+                        yield text
+
+
+class GeminiClientPool:
+    """
+    Owns the pooled HTTP transport and one `GeminiKeyClient` per key.
+    `max_in_flight` caps concurrent Gemini calls across all keys.
+    """
+
+    def __init__(self, keys: list[str], max_in_flight: int = 16, max_connections: int = 32,
+                 keepalive_expiry: float = 60.0, timeout: float = 30.0):
+        self._http = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
+        self._limiter = asyncio.Semaphore(max_in_flight)
+        self.clients = [GeminiKeyClient(i, key, self._http, self._limiter) for i, key in enumerate(keys)]
+
+    def __len__(self):
+        return len(self.clients)
+
+    def client(self, index: int) -> GeminiKeyClient:
+        return self.clients[index]
+
+    async def aclose(self):
+        await self._http.aclose()
@@ -0,0 +1,61 @@
+"""
+Multi-worker deployment:
+
+    gunicorn -c backend/gunicorn.conf.py backend.main:app
+
+The app is imported and the detector loaded once in the master process, then
+the heap is frozen out of the garbage collector's reach so forked workers keep
+sharing those pages copy-on-write. Gemini key health and quotas are shared
+through a SQLite file (KEY_STATE_DB). Workers default to the number of CPUs
+this container may use; override with WEB_CONCURRENCY.
+
+Everything else stays per worker: /metrics reports the worker that answered
+the scrape, and each worker has its own Gemini circuit breaker, per-client
+rate limits (so a client gets up to `workers` x CLIENT_RATE_PER_MINUTE),
+admission queues and detection cache.
+"""
+import gc
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.inference import available_cpus
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY") or available_cpus())
+os.environ["WEB_CONCURRENCY"] = str(workers)  # backend.main refuses per-worker-only features when > 1
+preload_app = True
+timeout = 120
+graceful_timeout = 30
+
+# Read by backend.main at import time, i.e. after this file. Key state holds monotonic
+# timestamps, so the default file is new for every master process and removed on exit
+DEFAULT_KEY_STATE_DB = os.path.join(tempfile.gettempdir(), f"waste-segregate-keys-{os.getpid()}.sqlite")
+os.environ.setdefault("KEY_STATE_DB", DEFAULT_KEY_STATE_DB)
+# One inference thread per worker: the workers already cover the cores, and
+# ONNX Runtime thread pools created before fork do not survive it
+os.environ.setdefault("DETECTOR_THREADS", "1")
+
+
+
+def when_ready(server):
+    # The app module is already imported (preload_app); load the weights before any fork
+    from backend import main
+
+    main.preload_models()
+    gc.freeze()
+    server.log.info(f"Preloaded detector, forking {workers} workers")
+
+
+def on_exit(server):
+    if os.environ["KEY_STATE_DB"] != DEFAULT_KEY_STATE_DB:
+        return
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(DEFAULT_KEY_STATE_DB + suffix)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,100 @@
+"""
+Dynamic micro-batching for local model inference.
+
+Concurrent requests submit single images; a collector task groups them into
+small batches (bounded by `max_batch_size` and `max_wait_ms`) and runs one
+batched forward pass on a dedicated worker thread, so the event loop stays
+free while the model runs.
+"""
+import asyncio
+import logging
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def available_cpus() -> int:
+    """CPUs usable by this process: affinity mask, capped by a cgroup v2 CPU quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+class BatchingExecutor:
+    """
+    Collects concurrent `submit()` calls into batches for `infer_fn`.
+    `infer_fn(images)` must return one result per input image, in order.
+    """
+
+    def __init__(self, infer_fn, max_batch_size: int = 8, max_wait_ms: float = 10.0, workers: int = 1):
+        self.infer_fn = infer_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self._workers = asyncio.Semaphore(workers)
+        self._queue: asyncio.Queue | None = None
+        self._collector: asyncio.Task | None = None
+
+    def _ensure_started(self):
+        if self._collector is None or self._collector.done():
+            self._queue = asyncio.Queue()
+            self._collector = asyncio.create_task(self._collect())
+
+    async def submit(self, image):
+        """Queues one image and waits for its result."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Callers that gave up while queued don't need a forward pass
+            batch = [(img, fut) for img, fut in batch if not fut.done()]
+            if not batch:
+                continue
+            await self._workers.acquire()
+            asyncio.create_task(self._run(batch))
+
+    async def _run(self, batch):
+        try:
+            images = [img for img, _ in batch]
+            results = await asyncio.get_running_loop().run_in_executor(self._pool, self.infer_fn, images)
+            for (_, fut), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
+        except Exception as e:
+            logger.error(f"Batched inference failed ({len(batch)} images): {e}")
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+        finally:
+            self._workers.release()
+
+    async def aclose(self):
+        if self._collector:
+            self._collector.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
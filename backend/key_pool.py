@@ -0,0 +1,290 @@
+"""
+Health-aware scheduling across Gemini API keys.
+
+Each key has its own token bucket (requests per minute), an exponential
+cooldown after rate-limit/quota errors, permanent removal after invalid-key
+errors, and a cached model choice. `acquire()` hands out the least-loaded
+key that is currently healthy and has budget left.
+
+`SharedKeyPool` keeps the same state in a SQLite database (WAL mode) so that
+several worker processes on one host schedule against common quotas. Callers
+on the event loop go through `await pool.run(pool.acquire, ...)`, which keeps
+its database transactions off the loop.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from backend.ratelimit import TokenBucket
+
+
+@dataclass
+class KeyState:
+    index: int
+    bucket: TokenBucket
+    model: str | None = None
+    in_flight: int = 0
+    cooldown_until: float = 0.0
+    consecutive_limits: int = 0
+    disabled: bool = False
+    disabled_reason: str = ""
+    model_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    def status(self, now: float) -> str:
+        if self.disabled:
+            return "disabled"
+        if self.cooldown_until > now:
+            return "cooling"
+        return "healthy"
+
+
+class KeyPool:
+    def __init__(self, size: int, requests_per_minute: float = 15.0, burst: float = 5.0,
+                 base_cooldown: float = 5.0, max_cooldown: float = 300.0):
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.keys = [KeyState(i, TokenBucket(requests_per_minute / 60.0, burst)) for i in range(size)]
+
+    def __len__(self):
+        return len(self.keys)
+
+    async def run(self, method, *args):
+        """Calls one of this pool's methods from async code (in-memory: directly)."""
+        return method(*args)
+
+    def acquire(self, exclude=()) -> KeyState | None:
+        """Reserves the least-loaded healthy key with budget, or returns None."""
+        now = time.monotonic()
+        candidates = [
+            k for k in self.keys
+            if k.index not in exclude and k.status(now) == "healthy" and k.bucket.peek() >= 1
+        ]
+        if not candidates:
+            return None
+        # Fewest in-flight calls first, then the fullest bucket
+        key = min(candidates, key=lambda k: (k.in_flight, -k.bucket.tokens))
+        key.bucket.try_take()
+        key.in_flight += 1
+        return key
+
+    def release(self, key: KeyState):
+        key.in_flight -= 1
+
+    def mark_success(self, key: KeyState):
+        key.consecutive_limits = 0
+
+    def mark_rate_limited(self, key: KeyState):
+        """Exponential cooldown: base, 2x base, 4x base ... capped."""
+        cooldown = min(self.max_cooldown, self.base_cooldown * (2 ** key.consecutive_limits))
+        key.consecutive_limits += 1
+        key.cooldown_until = time.monotonic() + cooldown
+        return cooldown
+
+    def mark_invalid(self, key: KeyState, reason: str = ""):
+        key.disabled = True
+        key.disabled_reason = reason
+
+    def refresh(self):
+        """Brings `keys` up to date with any shared state (nothing to do in-process)."""
+
+    def healthy_count(self) -> int:
+        now = time.monotonic()
+        return sum(1 for k in self.keys if k.status(now) == "healthy")
+
+    def usable_count(self) -> int:
+        """Keys that are not permanently disabled (cooling keys come back)."""
+        return sum(1 for k in self.keys if not k.disabled)
+
+    def retry_after(self) -> float:
+        """Seconds until some key is expected to accept a request again."""
+        now = time.monotonic()
+        waits = [
+            max(k.cooldown_until - now, k.bucket.wait_time())
+            for k in self.keys if not k.disabled
+        ]
+        return max(0.0, min(waits)) if waits else float("inf")
+
+    def snapshot(self) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "key": k.index + 1,
+                "status": k.status(now),
+                "model": k.model,
+                "in_flight": k.in_flight,
+                "tokens": round(k.bucket.peek(), 2),
+                "cooldown_s": round(max(0.0, k.cooldown_until - now), 1),
+            }
+            for k in self.keys
+        ]
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SharedKeyPool(KeyPool):
+    """
+    KeyPool whose health, budget and load live in SQLite, shared by every
+    process that opens the same file. Each write loads the rows, applies the
+    in-memory logic and writes them back inside one `BEGIN IMMEDIATE`
+    transaction, which can wait up to `timeout` seconds for other processes:
+    call the writes through `run()` from async code. Counts and snapshots use
+    the state as of this process's last transaction; `refresh()` reloads it.
+
+    In-flight calls are recorded per process id, and entries of processes that
+    have died (a worker killed mid-call) are dropped on the next write.
+    Timestamps are `time.monotonic()` values, which share one clock across
+    processes on the same host (not across reboots: start each deployment with
+    a fresh file). The chosen model stays per process.
+    """
+
+    _COLUMNS = "idx, tokens, updated, cooldown_until, consecutive_limits, disabled, disabled_reason"
+
+    def __init__(self, path: str, size: int, timeout: float = 10.0, **kwargs):
+        super().__init__(size, **kwargs)
+        self.path = path
+        self.timeout = timeout
+        self._own_in_flight = [0] * size  # This process's share of each key's in_flight
+        self._local = threading.local()   # One connection per thread (and per process)
+        self._lock = threading.Lock()     # Guards `keys` between the event loop and worker threads
+        with self._synced(write=True, load=False) as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS key_state ("
+                "idx INTEGER PRIMARY KEY, tokens REAL, updated REAL, cooldown_until REAL, "
+                "consecutive_limits INTEGER, disabled INTEGER, disabled_reason TEXT)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS key_in_flight ("
+                "idx INTEGER, pid INTEGER, calls INTEGER, PRIMARY KEY (idx, pid))"
+            )
+            # Only keys this file does not know yet; existing rows belong to running workers
+            db.executemany(
+                f"INSERT OR IGNORE INTO key_state ({self._COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [self._row(k) for k in self.keys],
+            )
+        self.refresh()
+
+    async def run(self, method, *args):
+        """Runs `method` in a worker thread: its transaction may wait on other processes."""
+        return await asyncio.to_thread(method, *args)
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections must not cross a fork or be shared between threads
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    @staticmethod
+    def _row(k: KeyState) -> tuple:
+        return (k.index, k.bucket.tokens, k.bucket.updated, k.cooldown_until,
+                k.consecutive_limits, int(k.disabled), k.disabled_reason)
+
+    def _load(self, db: sqlite3.Connection, reap: bool):
+        for idx, tokens, updated, cooldown_until, limits, disabled, reason in db.execute(
+            f"SELECT {self._COLUMNS} FROM key_state"
+        ):
+            if idx >= len(self.keys):
+                continue
+            k = self.keys[idx]
+            k.bucket.tokens, k.bucket.updated = tokens, updated
+            k.cooldown_until, k.consecutive_limits = cooldown_until, limits
+            k.disabled, k.disabled_reason = bool(disabled), reason
+
+        rows = db.execute("SELECT idx, pid, calls FROM key_in_flight").fetchall()
+        dead = {pid for _, pid, _ in rows if pid != os.getpid() and not _pid_alive(pid)}
+        if reap and dead:
+            db.executemany("DELETE FROM key_in_flight WHERE pid = ?", [(pid,) for pid in dead])
+        for k in self.keys:
+            k.in_flight = 0
+        for idx, pid, calls in rows:
+            if idx < len(self.keys) and pid not in dead:
+                self.keys[idx].in_flight += calls
+
+    def _store(self, db: sqlite3.Connection):
+        db.executemany(
+            "UPDATE key_state SET tokens=?, updated=?, cooldown_until=?, "
+            "consecutive_limits=?, disabled=?, disabled_reason=? WHERE idx=?",
+            [(*self._row(k)[1:], k.index) for k in self.keys],
+        )
+        pid = os.getpid()
+        db.execute("DELETE FROM key_in_flight WHERE pid = ?", (pid,))
+        db.executemany(
+            "INSERT INTO key_in_flight (idx, pid, calls) VALUES (?, ?, ?)",
+            [(idx, pid, calls) for idx, calls in enumerate(self._own_in_flight) if calls > 0],
+        )
+
+    @contextmanager
+    def _synced(self, write: bool = False, load: bool = True):
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+        try:
+            with self._lock:
+                if load:
+                    self._load(db, reap=write)
+                yield db
+                if write and load:
+                    self._store(db)
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def acquire(self, exclude=()) -> KeyState | None:
+        with self._synced(write=True):
+            key = super().acquire(exclude)
+            if key is not None:
+                self._own_in_flight[key.index] += 1
+            return key
+
+    def release(self, key: KeyState):
+        with self._synced(write=True):
+            self._own_in_flight[key.index] = max(0, self._own_in_flight[key.index] - 1)
+            super().release(key)
+
+    def mark_success(self, key: KeyState):
+        with self._synced(write=True):
+            super().mark_success(key)
+
+    def mark_rate_limited(self, key: KeyState):
+        with self._synced(write=True):
+            return super().mark_rate_limited(key)
+
+    def mark_invalid(self, key: KeyState, reason: str = ""):
+        with self._synced(write=True):
+            super().mark_invalid(key, reason)
+
+    def refresh(self):
+        """Reloads the shared state into `self.keys` (a WAL read: does not wait on writers)."""
+        with self._synced():
+            pass
+
+    def healthy_count(self) -> int:
+        with self._lock:
+            return super().healthy_count()
+
+    def usable_count(self) -> int:
+        with self._lock:
+            return super().usable_count()
+
+    def retry_after(self) -> float:
+        with self._lock:
+            return super().retry_after()
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            return super().snapshot()
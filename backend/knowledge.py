@@ -0,0 +1,218 @@
+"""
+Local item knowledge index for answering "which bin?" questions without Gemini.
+
+Items come from the in-code tables (BIN_MAPPING, CONTAMINATION_ITEMS,
+FALLBACK_INSIGHTS) plus JSON data files; data-file entries win when both
+define the same phrase. Queries are normalised (lowercase, punctuation
+stripped, plurals singularised) and matched by exact n-gram lookup first,
+then by character-trigram similarity to tolerate typos. Only bin questions
+are answered: the query has to ask about disposal ("where", "which bin",
+"recycle", ...) or consist of nothing but the item.
+"""
+import json
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+STOPWORDS = {
+    "a", "an", "the", "this", "that", "these", "those", "my", "our", "your", "of", "in", "into",
+    "on", "to", "do", "does", "did", "i", "we", "you", "it", "they", "should", "where", "which",
+    "what", "how", "go", "goes", "put", "throw", "away", "dispose", "recycle", "bin", "is", "are",
+    "or", "and", "with", "for", "please", "old", "used", "empty",
+}
+PRONOUNS = {"i", "you", "we", "they", "it", "he", "she", "this", "that"}
+# Words that make a query a question about where something goes (compared after singularizing)
+INTENT_WORDS = {
+    "where", "which", "bin", "recycle", "recyclable", "recycling", "compost", "compostable",
+    "dispose", "disposal", "discard", "throw", "toss", "trash", "landfill",
+}
+# Detector class names that are also everyday words ("tie a bag", "book a pickup", "the orange bin"):
+# only indexed under these unambiguous aliases
+AMBIGUOUS_NAMES = {
+    "tie": ["necktie"],
+    "mouse": ["computer mouse"],
+    "book": ["paperback", "hardcover book"],
+    "orange": ["orange peel", "orange fruit"],
+    "remote": ["remote control", "tv remote"],
+    "tv": ["television", "tv set"],
+}
+PLURAL_EXCEPTIONS = {"glasses": "glass", "knives": "knife", "leaves": "leaf", "shoes": "shoe", "clothes": "clothes",
+                     "batteries": "battery", "dishes": "dish", "boxes": "box"}
+
+# Generic advice that holds for everything in the bin; item-specific tips live in the data files
+BIN_TIPS = {
+    "Organic": "Compost it with your food scraps and keep any packaging out.",
+    "Hazardous": "Take it to an e-waste or hazardous-waste drop-off point, never the household bins.",
+    "Landfill": "It can't be recycled curbside, so it belongs in general waste.",
+}
+
+
+def singularize(word: str) -> str:
+    if word in PLURAL_EXCEPTIONS:
+        return PLURAL_EXCEPTIONS[word]
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "xes", "zes", "sses", "oes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    return [singularize(w) for w in re.findall(r"[a-z0-9]+", text.lower())]
+
+
+def normalize(text: str) -> str:
+    """Canonical form used for lookups and cache keys ("Plastic Bottles!" -> "plastic bottle")."""
+    return " ".join(tokenize(text))
+
+
+def _is_stopword(words: list[str]) -> bool:
+    return len(words) == 1 and words[0] in STOPWORDS
+
+
+def _trigrams(phrase: str) -> set[str]:
+    padded = f"  {phrase} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class KnowledgeItem:
+    name: str
+    bin: str
+    contaminated: bool = False
+    metadata: dict = field(default_factory=dict)
+    tip: str = ""
+
+
+@dataclass
+class Match:
+    item: KnowledgeItem
+    phrase: str
+    score: float
+
+
+class ItemIndex:
+    def __init__(self, max_ngram: int = 3, fuzzy_threshold: float = 0.62):
+        self.max_ngram = max_ngram
+        self.fuzzy_threshold = fuzzy_threshold
+        self.phrases: dict[str, KnowledgeItem] = {}
+        self._trigram_index: dict[str, set[str]] = defaultdict(set)
+        self._trigram_counts: dict[str, int] = {}
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def add(self, item: KnowledgeItem, aliases=(), index_name: bool = True):
+        for phrase in ((item.name,) if index_name else ()) + tuple(aliases):
+            key = normalize(phrase)
+            if not key:
+                continue
+            self.phrases[key] = item
+            grams = _trigrams(key)
+            self._trigram_counts[key] = len(grams)
+            for gram in grams:
+                self._trigram_index[gram].add(key)
+
+    def _fuzzy(self, phrase: str) -> Match | None:
+        grams = _trigrams(phrase)
+        shared = defaultdict(int)
+        for gram in grams:
+            for candidate in self._trigram_index.get(gram, ()):
+                shared[candidate] += 1
+        best = None
+        for candidate, common in shared.items():
+            score = common / (len(grams) + self._trigram_counts[candidate] - common)
+            if score >= self.fuzzy_threshold and (best is None or score > best.score):
+                best = Match(self.phrases[candidate], candidate, score)
+        return best
+
+    def lookup(self, text: str) -> list[Match]:
+        """All items mentioned in `text`, longest phrases first, without overlaps."""
+        return self._scan(text)[0]
+
+    def _scan(self, text: str):
+        """(matches, tokens, indices of tokens covered by a match)."""
+        raw = re.findall(r"[a-z0-9]+", text.lower())
+        tokens = [singularize(w) for w in raw]
+        # "can I recycle ..." is a verb, "a can" / "cans" is an item
+        skip = {i for i, w in enumerate(raw) if w == "can" and (i == 0 or (i + 1 < len(raw) and raw[i + 1] in PRONOUNS))}
+        # "the orange bin", "recycle bin": words naming a bin are not items
+        skip |= {i for i in range(len(tokens) - 1) if tokens[i + 1] == "bin"}
+
+        matches, used = [], set()
+
+        def spans(max_n):
+            for n in range(min(max_n, len(tokens)), 0, -1):
+                for start in range(len(tokens) - n + 1):
+                    span = set(range(start, start + n))
+                    if not (span & used or span & skip):
+                        yield span, tokens[start:start + n]
+
+        # Exact phrases first (longest wins), then typo-tolerant matching on what is left
+        for span, words in spans(self.max_ngram):
+            if _is_stopword(words):
+                continue
+            phrase = " ".join(words)
+            item = self.phrases.get(phrase)
+            if item is not None:
+                matches.append(Match(item, phrase, 1.0))
+                used |= span
+        for span, words in spans(2):
+            if any(w in STOPWORDS for w in words):
+                continue
+            phrase = " ".join(words)
+            if len(phrase) < 4:
+                continue
+            fuzzy = self._fuzzy(phrase)
+            if fuzzy is not None:
+                matches.append(fuzzy)
+                used |= span
+        return matches, tokens, used
+
+    def answer(self, text: str, max_words: int = 12) -> Match | None:
+        """
+        A confident match: a short bin question (or just the item's name) where
+        everything mentioned goes in the same bin. The most specific (longest)
+        phrase is the one answered.
+        """
+        if len(text.split()) > max_words:
+            return None
+        matches, tokens, used = self._scan(text)
+        if not matches or len({m.item.bin for m in matches}) != 1:
+            return None
+        bare_item = all(i in used or w in STOPWORDS for i, w in enumerate(tokens))
+        if not bare_item and not INTENT_WORDS.intersection(tokens):
+            return None
+        return max(matches, key=lambda m: (len(m.phrase.split()), m.score))
+
+    @staticmethod
+    def format_answer(match: Match) -> str:
+        item = match.item
+        # Name what the user asked about ("wine glass"), not the entry it belongs to ("ceramic")
+        sentences = [f"{match.phrase.capitalize()} goes in the {item.bin} bin.", item.tip or BIN_TIPS.get(item.bin, "")]
+        if item.metadata.get("transformation"):
+            sentences.append(item.metadata["transformation"])
+        return " ".join(s for s in sentences[:3] if s)
+
+    @classmethod
+    def build(cls, bin_mapping: dict, contamination_items: set, insights: dict, data_files=()):
+        index = cls()
+        for name, bin_name in bin_mapping.items():
+            meta = next((data for key, data in insights.items() if key != "default" and key in name), {})
+            item = KnowledgeItem(name, bin_name, name in contamination_items, meta)
+            index.add(item, AMBIGUOUS_NAMES.get(name, ()), index_name=name not in AMBIGUOUS_NAMES)
+        for path in data_files:
+            with open(path, encoding="utf-8") as f:
+                for entry in json.load(f):
+                    index.add(
+                        KnowledgeItem(
+                            entry["name"], entry["bin"], entry.get("contaminated", False),
+                            entry.get("metadata", {}), entry.get("tip", ""),
+                        ),
+                        entry.get("aliases", ()),
+                    )
+        return index
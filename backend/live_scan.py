@@ -0,0 +1,132 @@
+"""
+Live-scan WebSocket sessions.
+
+The client streams JPEG frames as binary messages. Only the newest frame is
+kept (stale frames are dropped while we are busy), full detection runs only on
+keyframes, and an `ItemTracker` carries the detected items, with stable ids,
+across the frames in between.
+
+Keyframes are chosen adaptively: the interval doubles while the scene stays
+the same (up to `max_interval`) and a scene change, measured as the Hamming
+distance between perceptual frame hashes, forces an immediate keyframe.
+A keyframe that fails the optional `frame_check` (dark, blank, blurred) is
+not sent to detection; the next frame becomes the keyframe instead. When
+`detect` refuses a keyframe (admission control), tracking carries on and the
+next keyframe waits for the suggested retry delay.
+"""
+import asyncio
+import logging
+import time
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from backend.admission import Rejected
+from backend.structured import dumps
+from backend.tracking import ItemTracker
+
+logger = logging.getLogger(__name__)
+
+
+class LiveScanSession:
+    def __init__(self, detect, frame_hash, min_interval: int = 2, max_interval: int = 16,
+                 scene_change_distance: int = 10, max_frame_bytes: int = 10 * 1024 * 1024, frame_check=None):
+        self.detect = detect          # async (jpeg bytes) -> DetectionResponse
+        self.frame_hash = frame_hash  # (jpeg bytes) -> int, CPU bound
+        self.frame_check = frame_check  # (jpeg bytes) -> rejection reason or None, CPU bound
+        self.min_interval = max(1, min_interval)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.scene_change_distance = scene_change_distance
+        self.max_frame_bytes = max_frame_bytes
+        self.tracker = ItemTracker()
+
+        self.interval = self.min_interval
+        self.since_keyframe = 0
+        self.keyframe_hash = None
+        self.received = 0
+        self.dropped = 0
+        self._latest: tuple[int, bytes] | None = None
+        self._frame_ready = asyncio.Event()
+        self._retry_at = 0.0  # No detection before this time (monotonic) after a refusal
+
+    async def _receive(self, websocket: WebSocket):
+        while True:
+            data = await websocket.receive_bytes()
+            self.received += 1
+            if len(data) > self.max_frame_bytes:
+                self.dropped += 1
+                continue
+            if self._latest is not None:
+                self.dropped += 1  # Never processed: superseded by a newer frame
+            self._latest = (self.received, data)
+            self._frame_ready.set()
+
+    async def _is_keyframe(self, data: bytes) -> bool:
+        frame_hash = await asyncio.to_thread(self.frame_hash, data)
+        if self.keyframe_hash is None:
+            self.keyframe_hash = frame_hash
+            return True
+        distance = (frame_hash ^ self.keyframe_hash).bit_count()
+        if distance > self.scene_change_distance:
+            self.interval = self.min_interval
+        elif self.since_keyframe + 1 < self.interval:
+            return False
+        else:
+            self.interval = min(self.max_interval, self.interval * 2)
+        self.keyframe_hash = frame_hash
+        return True
+
+    async def _process(self, websocket: WebSocket):
+        while True:
+            await self._frame_ready.wait()
+            self._frame_ready.clear()
+            seq, data = self._latest
+            self._latest = None
+
+            rejected = None
+            try:
+                keyframe = time.monotonic() >= self._retry_at and await self._is_keyframe(data)
+                if keyframe and self.frame_check is not None:
+                    rejected = await asyncio.to_thread(self.frame_check, data)
+            except Exception as e:
+                logger.error(f"Live scan frame {seq} unreadable: {e}")
+                continue
+            if rejected is not None:
+                keyframe = False
+                self.keyframe_hash = None  # Retry detection on the next frame
+
+            response = None
+            if keyframe:
+                try:
+                    response = await self.detect(data)
+                except Rejected as e:
+                    logger.warning(f"Live scan frame {seq} not admitted: {e}")
+                    rejected = "busy"
+                    keyframe = False
+                    self.keyframe_hash = None
+                    self._retry_at = time.monotonic() + e.retry_after
+            if response is not None:
+                items = self.tracker.update(response.items)
+                self.since_keyframe = 0
+            else:
+                items = self.tracker.items()
+                self.since_keyframe += 1
+
+            await websocket.send_text(dumps({
+                "frame": seq,
+                "keyframe": keyframe,
+                "items": [item.model_dump() for item in items],
+                "dropped": self.dropped,
+                "rejected": rejected,
+            }))
+
+    async def run(self, websocket: WebSocket):
+        tasks = [asyncio.create_task(self._receive(websocket)), asyncio.create_task(self._process(websocket))]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                exc = task.exception()
+                if exc and not isinstance(exc, WebSocketDisconnect):
+                    raise exc
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -1,11 +1,43 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Response, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.requests import HTTPConnection
 from pydantic import BaseModel
-from PIL import Image
-import io
+import asyncio
+import hashlib
+import itertools
 import logging
+import math
 import os
+import sys
+import time
+import zipfile
 import dotenv
+import numpy as np
+
+# Allow both `uvicorn backend.main:app` (repo root) and `python main.py` (backend/)
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.gemini_client import GeminiClientPool, GeminiError, classify_error, select_model
+from backend.key_pool import KeyPool, SharedKeyPool
+from backend.readiness import DISABLED, LOADING, READY, UNAVAILABLE, BackendStatus, overall_state, wait_for_first_ready
+from backend.inference import BatchingExecutor
+from backend.detectors import ClassInfo, ClassTable
+from backend.detection_cache import DetectionCache, content_key, dhash
+from backend.preprocess import UploadTooLarge, decode_thumbnail, prepare_image, read_upload
+from backend.live_scan import LiveScanSession
+from backend.knowledge import ItemIndex, normalize
+from backend.singleflight import SingleFlight
+from backend.metrics import InFlightMiddleware, Registry
+from backend.chat_stream import BinLineFilter, parse_bin, sse_event
+from backend.structured import BIN_ENUM, gemini_schema, json_mode, parse_json
+from backend.enrichment import EnrichmentJobs
+from backend.metadata_store import MetadataStore, is_complete
+from backend.circuit_breaker import CircuitBreaker, CircuitOpen
+from backend.admission import AdmissionQueue, ClientLimiter, QueueFull, RateLimited, Rejected, client_address, parse_networks
+from backend.frame_quality import FrameGate
 
 # Load environment variables
 dotenv.load_dotenv()
@@ -18,7 +50,36 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Waste Segregate API", version="1.0.0")
+# ─────────────────────────────────────────────────────────────
+# Metrics (Prometheus text format at /metrics)
+# ─────────────────────────────────────────────────────────────
+metrics = Registry()
+stage_seconds = metrics.histogram("waste_stage_seconds", "Time spent in each request stage", ["endpoint", "stage"])
+key_rotations = metrics.counter("waste_gemini_key_rotations_total", "Gemini calls moved off a key, by reason", ["reason"])
+errors_total = metrics.counter("waste_errors_total", "Errors by type", ["type"])
+detections_total = metrics.counter("waste_detections_total", "Detection responses by serving path", ["source"])
+live_repeats_reused = metrics.counter("waste_live_repeats_reused_total", "Live-scan keyframes answered with the result of a near-identical earlier keyframe")
+frames_rejected = metrics.counter("waste_frames_rejected_total", "Frames refused by the quality gate, by reason", ["endpoint", "reason"])
+detect_escalations = metrics.counter("waste_detect_escalations_total", "Local-first detections handed to Gemini, by reason", ["reason"])
+chat_answers_total = metrics.counter("waste_chat_answers_total", "Chat answers by serving path", ["source"])
+admission_rejections = metrics.counter("waste_admission_rejections_total", "Requests refused by admission control", ["endpoint", "reason"])
+http_in_flight = metrics.gauge("waste_http_requests_in_flight", "Requests currently being handled", ["path"])
+http_seconds = metrics.histogram("waste_http_request_seconds", "End-to-end request latency", ["path", "status"])
+METRIC_PATHS = ["/detect", "/detect/batch", "/ws/scan", "/enrich", "/chat", "/chat/stream", "/health", "/ready", "/metrics"]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy setup runs in the background so the worker starts serving immediately
+    warmup_task = asyncio.create_task(warm_up())
+    yield
+    warmup_task.cancel()
+    await enrichment_jobs.aclose()
+    await gemini_pool.aclose()
+    await yolo_executor.aclose()
+
+
+app = FastAPI(title="Waste Segregate API", version="1.0.0", lifespan=lifespan)
 
 # ─────────────────────────────────────────────────────────────
 # Demo Mode Flag
@@ -31,12 +92,14 @@ DEMO_MODE = False  # Changed to False to debug real detection
 # CORS enabled for frontend
 # ─────────────────────────────────────────────────────────────
 
+app.add_middleware(InFlightMiddleware, in_flight=http_in_flight, latency=http_seconds, paths=METRIC_PATHS)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "X-Detection-Source"],
 )
 
 
@@ -44,18 +107,60 @@ app.add_middleware(
 # Load YOLOv8 Model (with fallback)
 # ─────────────────────────────────────────────────────────────
 
-model = None
+# "ultralytics" (yolov8n.pt, needs torch) or "onnx" (ONNX Runtime only, see backend/export_onnx.py)
+DETECTOR_BACKEND = os.getenv("DETECTOR_BACKEND", "ultralytics").lower()
+DETECTOR_INT8 = os.getenv("DETECTOR_INT8", "0") == "1"
+DETECTOR_ONNX_PATH = os.getenv("DETECTOR_ONNX_PATH") or None
+DETECTOR_THREADS = int(os.getenv("DETECTOR_THREADS", "0"))
+
+model = None  # Loaded by the background warm-up (see warm_up below)
+class_table = None  # Per-class bin/contamination/metadata, built alongside the model
+
+YOLO_CONF_THRESHOLD = float(os.getenv("YOLO_CONF_THRESHOLD", "0.25"))
+YOLO_MAX_ITEMS = int(os.getenv("YOLO_MAX_ITEMS", "3"))
+PERSON_CLASSES = {"person", "face", "hand", "man", "woman"}  # Never reported as waste
+
+
+def load_yolo_model():
+    """
+    Imports the detector runtime, loads the weights and resolves every class
+    once into a ClassTable. Slow: run in a thread. Returns (detector, table).
+    """
+    from backend.detectors import load_detector
+    detector = load_detector(DETECTOR_BACKEND, int8=DETECTOR_INT8, onnx_path=DETECTOR_ONNX_PATH, threads=DETECTOR_THREADS)
+    table = ClassTable.build(detector.names, describe_class, PERSON_CLASSES)
+    print(f"✅ YOLOv8 model loaded successfully ({detector.backend}).")
+    return detector, table
 
-try:
-    from ultralytics import YOLO
-    # Load model with absolute path for cloud stability
-    base_dir = os.path.dirname(__file__)
-    model_path = os.path.join(base_dir, "yolov8n.pt")
-    model = YOLO(model_path)
-    print(f"✅ YOLOv8 model loaded successfully from {model_path}.")
-except Exception as e:
-    print(f"⚠️ Failed to load YOLOv8 model: {e}")
-    pass  # Model will be None, DEMO_MODE will handle it
+
+def run_yolo_batch(images):
+    """One batched forward pass; returns one Detections per image."""
+    return model.predict(images)
+
+
+# ─── Preprocessing: upload limit and per-backend input sizes ───
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+YOLO_INPUT_SIZE = int(os.getenv("YOLO_INPUT_SIZE", "640"))
+GEMINI_IMAGE_MAX_SIDE = int(os.getenv("GEMINI_IMAGE_MAX_SIDE", "512"))
+GEMINI_JPEG_QUALITY = int(os.getenv("GEMINI_JPEG_QUALITY", "80"))
+
+# ─── Frame quality gate: dark, blank and blurred frames never reach a model ───
+# Live scan also reuses the result of a keyframe repeated within FRAME_DUPLICATE_WINDOW_S
+FRAME_GATE = os.getenv("FRAME_GATE", "1") == "1"
+FRAME_GATE_SIZE = int(os.getenv("FRAME_GATE_SIZE", "128"))  # Checks run on a thumbnail this big
+frame_gate = FrameGate(
+    min_brightness=float(os.getenv("FRAME_MIN_BRIGHTNESS", "20")),
+    max_brightness=float(os.getenv("FRAME_MAX_BRIGHTNESS", "240")),
+    min_contrast=float(os.getenv("FRAME_MIN_CONTRAST", "8")),
+    min_sharpness=float(os.getenv("FRAME_MIN_SHARPNESS", "20")),
+    duplicate_mad=float(os.getenv("FRAME_DUPLICATE_MAD", "2.0")),  # 0 disables reusing live-scan results
+    duplicate_window_s=float(os.getenv("FRAME_DUPLICATE_WINDOW_S", "3")),
+)
+
+# Concurrent /detect requests are grouped into small batches off the event loop
+YOLO_MAX_BATCH_SIZE = int(os.getenv("YOLO_MAX_BATCH_SIZE", "8"))
+YOLO_MAX_WAIT_MS = float(os.getenv("YOLO_MAX_WAIT_MS", "10"))
+yolo_executor = BatchingExecutor(run_yolo_batch, max_batch_size=YOLO_MAX_BATCH_SIZE, max_wait_ms=YOLO_MAX_WAIT_MS)
 
 
 # ─────────────────────────────────────────────────────────────
@@ -67,7 +172,6 @@ BIN_MAPPING = {
     "bottle": "Recycle",
     "can": "Recycle",
     "cup": "Recycle",
-    "wine glass": "Recycle",
     "vase": "Recycle",
     "book": "Recycle",
     "paper": "Recycle",
@@ -93,6 +197,7 @@ BIN_MAPPING = {
     "suitcase": "Landfill",
     "umbrella": "Landfill",
     "tie": "Landfill",
+    "wine glass": "Landfill",  # Drinking glass melts differently from bottle glass (see knowledge_items.json)
 
     # ─── Hazardous / Hybrid (E-waste) ───
     "cell phone": "Hazardous",
@@ -140,6 +245,9 @@ class DetectedItem(BaseModel):
 
 class DetectionResponse(BaseModel):
     items: list[DetectedItem]
+    enrichmentId: str | None = None  # Deferred enrichment: fetch metadata from /enrich/{id}
+    source: str | None = None  # Path that served it: gemini, local, cache, none, demo, rejected
+    rejected: str | None = None  # Frame-quality gate: too_dark, too_bright, blank or blurry
 
 
 class ChatRequest(BaseModel):
@@ -151,6 +259,50 @@ class ChatResponse(BaseModel):
     binSuggestion: str = "Landfill" # Default
 
 
+class ItemEnrichment(BaseModel):
+    id: int
+    itemType: str
+    metadata: dict = {}
+
+
+class EnrichmentResponse(BaseModel):
+    enrichmentId: str
+    status: str  # "pending", "ready" or "failed"
+    items: list[ItemEnrichment] = []
+    error: str | None = None
+
+
+# Gemini JSON mode: constrain answers to schemas derived from the models above
+GEMINI_JSON_MODE = os.getenv("GEMINI_JSON_MODE", "1") == "1"
+ITEM_METADATA_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "transformation": {"type": "STRING"},
+        "impact": {"type": "STRING"},
+        "fun_fact": {"type": "STRING"},
+    },
+    "required": ["transformation", "impact", "fun_fact"],
+}
+
+
+def items_schema(item_schema: dict) -> dict:
+    return {"type": "OBJECT", "properties": {"items": {"type": "ARRAY", "items": item_schema}}, "required": ["items"]}
+
+
+# metadata is optional: it is left out for item types the metadata store already knows
+DETECTION_SCHEMA = items_schema(gemini_schema(
+    DetectedItem, exclude=("id", "bbox"), overrides={"bin": BIN_ENUM, "metadata": ITEM_METADATA_SCHEMA},
+    optional=("metadata",),
+))
+DETECTION_FAST_SCHEMA = items_schema(gemini_schema(DetectedItem, exclude=("id", "bbox", "metadata"), overrides={"bin": BIN_ENUM}))
+ENRICHMENT_SCHEMA = items_schema(gemini_schema(ItemEnrichment, exclude=("id",), overrides={"metadata": ITEM_METADATA_SCHEMA}))
+CHAT_SCHEMA = gemini_schema(ChatResponse, overrides={"binSuggestion": BIN_ENUM})
+DETECTION_GENERATION_CONFIG = json_mode(DETECTION_SCHEMA) if GEMINI_JSON_MODE else None
+DETECTION_FAST_GENERATION_CONFIG = json_mode(DETECTION_FAST_SCHEMA) if GEMINI_JSON_MODE else None
+ENRICHMENT_GENERATION_CONFIG = json_mode(ENRICHMENT_SCHEMA) if GEMINI_JSON_MODE else None
+CHAT_GENERATION_CONFIG = json_mode(CHAT_SCHEMA) if GEMINI_JSON_MODE else None
+
+
 # ─────────────────────────────────────────────────────────────
 # Fallback Demo Data
 # ─────────────────────────────────────────────────────────────
@@ -199,117 +351,320 @@ def is_contaminated(class_name: str) -> bool:
     return class_name.lower() in CONTAMINATION_ITEMS
 
 
+def describe_class(class_name: str) -> ClassInfo:
+    return ClassInfo(
+        name=class_name.capitalize(),
+        bin=get_bin_for_item(class_name),
+        contaminated=is_contaminated(class_name),
+        metadata=get_fallback_metadata(class_name),
+    )
+
+
+# ─────────────────────────────────────────────────────────────
+# Admission Control (bounded queues + per-client rate limits)
+# ─────────────────────────────────────────────────────────────
+# Expensive work waits for a slot in its endpoint's queue; when the queue is
+# full the request is refused at once with 503 + Retry-After. Cheap requests
+# (/health, /ready, chat fast-path answers) never queue.
+DETECT_CONCURRENCY = int(os.getenv("DETECT_CONCURRENCY", "8"))
+DETECT_QUEUE_SIZE = int(os.getenv("DETECT_QUEUE_SIZE", "16"))
+CHAT_CONCURRENCY = int(os.getenv("CHAT_CONCURRENCY", "16"))
+CHAT_QUEUE_SIZE = int(os.getenv("CHAT_QUEUE_SIZE", "32"))
+CLIENT_RATE_PER_MINUTE = float(os.getenv("CLIENT_RATE_PER_MINUTE", "60"))  # 0 disables per-client limits
+CLIENT_BURST = float(os.getenv("CLIENT_BURST", "20"))
+# Reverse proxies (addresses/CIDRs) whose X-Forwarded-For is believed; nobody's by default
+TRUSTED_PROXIES = parse_networks(os.getenv("TRUSTED_PROXIES", ""))
+
+# Queue priorities (lower runs first): a kiosk waiting on a scan beats bulk uploads
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+
+detect_queue = AdmissionQueue("detect", DETECT_CONCURRENCY, DETECT_QUEUE_SIZE)
+chat_queue = AdmissionQueue("chat", CHAT_CONCURRENCY, CHAT_QUEUE_SIZE)
+client_limiter = ClientLimiter(CLIENT_RATE_PER_MINUTE, CLIENT_BURST)
+
+
+def client_id(connection: HTTPConnection) -> str:
+    """The caller's address (see admission.client_address for proxies); works for requests and sockets."""
+    peer = connection.client.host if connection.client else None
+    return client_address(peer, connection.headers.get("x-forwarded-for"), TRUSTED_PROXIES)
+
+
+def admission_error(endpoint: str, e: Rejected) -> HTTPException:
+    rate_limited = isinstance(e, RateLimited)
+    admission_rejections.inc(endpoint=endpoint, reason="rate_limited" if rate_limited else "queue_full")
+    print(f"🚦 {endpoint}: {e}")
+    return HTTPException(
+        status_code=429 if rate_limited else 503,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
 # ─────────────────────────────────────────────────────────────
 # Endpoints
 # ─────────────────────────────────────────────────────────────
 
+# Health/readiness are async so they answer on the event loop even when the thread pool is busy
 @app.get("/health")
-def health_check():
+async def health_check():
     """Health check endpoint - always returns ok"""
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint - reports the warm-up state of each detection backend"""
+    await key_pool.run(key_pool.refresh)
+    backends = {
+        "gemini": {**gemini_status.to_dict(), "circuit": gemini_breaker.to_dict(), "keys": key_pool.snapshot()},
+        "yolo": yolo_status.to_dict(),
+    }
+    # "unavailable" once every backend has settled without one being usable
+    state = overall_state([gemini_status, yolo_status])
+    status = {READY: "ready", LOADING: "warming"}.get(state, "unavailable")
+    return JSONResponse(
+        status_code=200 if state == READY else 503,
+        content={"status": status, "backends": backends},
+    )
+
+
 # ─────────────────────────────────────────────────────────────
 # Google Gemini Setup (with Multi-Key Rotation)
 # ─────────────────────────────────────────────────────────────
-from dotenv import load_dotenv
-import random
-
-load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "YOUR_API_KEY_HERE")
 # Support multiple keys separated by commas
 RAW_KEYS = GEMINI_API_KEY.split(",")
 GEMINI_KEYS = [k.strip() for k in RAW_KEYS if k.strip() and k.strip() != "YOUR_API_KEY_HERE"]
 print(f"🔑 Loaded {len(GEMINI_KEYS)} Gemini keys from .env")
-current_key_index = 0
 
-def init_gemini_with_key(index):
-    """Initializes the Gemini model with a specific key from the pool."""
-    if index >= len(GEMINI_KEYS): return None
-    key = GEMINI_KEYS[index]
-    try:
-        import google.generativeai as genai
-        genai.configure(api_key=key)
-        
-        # Determine the best model for this key
-        all_models = [m.name for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
-        
-        # Preference order for modern models
-        preferences = [
-            'models/gemini-1.5-flash', 
-            'models/gemini-1.5-pro', 
-            'models/gemini-pro',
-            'models/gemini-2.0-flash-exp'
-        ]
-        
-        selected_model = None
-        for pref in preferences:
-            for m in all_models:
-                if pref == m:
-                    selected_model = m
-                    break
-            if selected_model: break
-            
-        # Last resort fallback: any model with 'gemini' in its name
-        if not selected_model:
-            for m in all_models:
-                if 'gemini' in m.lower():
-                    selected_model = m
-                    break
-        
-        if not selected_model:
-            selected_model = 'models/gemini-1.5-flash' # Final hard fallback
-            
-        logger.info(f"📡 Selected model '{selected_model}' for Key #{index+1}")
-        return genai.GenerativeModel(selected_model)
-    except Exception as e:
-        logger.error(f"⚠️ Initialization of Key #{index+1} failed: {e}")
-        return None
+# Async transport: one client per key over a shared keep-alive pool
+GEMINI_MAX_IN_FLIGHT = int(os.getenv("GEMINI_MAX_IN_FLIGHT", "16"))
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "32"))
+GEMINI_TIMEOUT_S = float(os.getenv("GEMINI_TIMEOUT_S", "30"))
+gemini_pool = GeminiClientPool(
+    GEMINI_KEYS,
+    max_in_flight=GEMINI_MAX_IN_FLIGHT,
+    max_connections=GEMINI_MAX_CONNECTIONS,
+    timeout=GEMINI_TIMEOUT_S,
+)
+
+# Key scheduler: per-key RPM budget, cooldown after 429/quota, removal after invalid-key errors
+KEY_POOL_OPTIONS = dict(
+    requests_per_minute=float(os.getenv("GEMINI_KEY_RPM", "15")),
+    burst=float(os.getenv("GEMINI_KEY_BURST", "5")),
+    base_cooldown=float(os.getenv("GEMINI_KEY_COOLDOWN_S", "5")),
+    max_cooldown=float(os.getenv("GEMINI_KEY_MAX_COOLDOWN_S", "300")),
+)
+# Multi-worker mode (backend/gunicorn.conf.py): key health and quotas shared through SQLite
+KEY_STATE_DB = os.getenv("KEY_STATE_DB")
+if KEY_STATE_DB:
+    key_pool = SharedKeyPool(KEY_STATE_DB, len(GEMINI_KEYS), **KEY_POOL_OPTIONS)
+else:
+    key_pool = KeyPool(len(GEMINI_KEYS), **KEY_POOL_OPTIONS)
 
-# Initial Setup
-gemini_model = init_gemini_with_key(current_key_index)
+# Circuit breaker: after repeated whole-call failures Gemini is skipped outright for a while
+gemini_breaker = CircuitBreaker(
+    "Gemini",
+    failure_rate=float(os.getenv("GEMINI_BREAKER_FAILURE_RATE", "0.5")),
+    window=int(os.getenv("GEMINI_BREAKER_WINDOW", "20")),
+    min_calls=int(os.getenv("GEMINI_BREAKER_MIN_CALLS", "5")),
+    open_seconds=float(os.getenv("GEMINI_BREAKER_OPEN_S", "30")),
+    max_open_seconds=float(os.getenv("GEMINI_BREAKER_MAX_OPEN_S", "300")),
+)
+
+def gemini_available():
+    return GEMINI_API_KEY != "YOUR_API_KEY_HERE" and key_pool.usable_count() > 0
+
+def gemini_reachable():
+    """Configured and not cut off by the circuit breaker."""
+    return gemini_available() and gemini_breaker.available()
+
+def admit_gemini_call():
+    if not gemini_breaker.allow():
+        raise CircuitOpen(gemini_breaker.name, gemini_breaker.retry_after())
+
+async def init_gemini_with_key(key):
+    """Selects (once) and caches the Gemini model to use with a key from the pool."""
+    async with key.model_lock:
+        if key.model is None:
+            # Determine the best model for this key
+            all_models = await gemini_pool.client(key.index).list_models()
+            key.model = select_model(all_models)
+            logger.info(f"📡 Selected model '{key.model}' for Key #{key.index+1}")
+    return key.model
+
+async def report_key_error(key, e):
+    """Updates the key's health after a failed call; returns a loggable description."""
+    last_error = f"Key #{key.index+1} error: {str(e)}"
+    kind = classify_error(e)
+    key_rotations.inc(reason=kind)
+    errors_total.inc(type=f"gemini_{kind}")
+    if kind == "rate_limited":
+        cooldown = await key_pool.run(key_pool.mark_rate_limited, key)
+        logger.warning(f"🔄 Cooling down Key #{key.index+1} for {cooldown:.0f}s: {last_error}")
+    elif kind == "invalid_key":
+        await key_pool.run(key_pool.mark_invalid, key, str(e))
+        logger.error(f"🚫 Removing Key #{key.index+1} from the pool: {last_error}")
+    elif kind == "model_not_found":
+        # Pick the model again next time this key is used
+        key.model = None
+        logger.warning(f"🔄 Model unavailable for Key #{key.index+1}: {last_error}")
+    else:
+        logger.error(f"⚠️ Unexpected error with key #{key.index+1}: {str(e)}")
+    return last_error
 
-async def call_gemini_robust(prompt_data):
+async def report_key_success(key, model_name):
+    await key_pool.run(key_pool.mark_success, key)
+    if not gemini_status.ready:
+        gemini_status.set(READY, f"Key #{key.index+1} using {model_name}")
+
+def keys_exhausted_error(last_error):
+    if not last_error:
+        return GeminiError(
+            f"429 All Gemini API keys are cooling down or out of budget (retry in {key_pool.retry_after():.0f}s)",
+            status_code=429,
+        )
+    return Exception(f"All Gemini API keys failed or are exhausted. Last error: {last_error}")
+
+async def call_gemini_robust(prompt_data, generation_config=None):
     """
-    Tries to call Gemini's generate_content using all available keys.
+    Calls Gemini's generate_content on the least-loaded healthy key,
+    moving on to other keys when one is rate limited or rejected.
     prompt_data can be a string (for chat) or a list (for detection with image).
+    Raises CircuitOpen without trying any key while the breaker is open.
     """
-    global current_key_index, gemini_model
-    
+    admit_gemini_call()
+    try:
+        content = await call_gemini_keys(prompt_data, generation_config)
+    except asyncio.CancelledError:
+        gemini_breaker.release()
+        raise
+    except Exception:
+        gemini_breaker.record_failure()
+        raise
+    gemini_breaker.record_success()
+    return content
+
+async def call_gemini_keys(prompt_data, generation_config=None):
     last_error = ""
-    # We will try every key in the list exactly once
-    for _ in range(len(GEMINI_KEYS)):
-        if not gemini_model:
-            gemini_model = init_gemini_with_key(current_key_index)
-            
-        if gemini_model:
-            try:
-                # Actual call
-                logger.info(f"🛰️ Calling Gemini with Key #{current_key_index+1}...")
-                response = gemini_model.generate_content(prompt_data)
-                return response.text
-            except Exception as e:
-                err_str = str(e).lower()
-                last_error = f"Key #{current_key_index+1} error: {str(e)}"
-                
-                # Check for rate limit OR forbidden OR permission issues OR not found
-                should_rotate = any(x in err_str for x in ["429", "quota", "exhausted", "403", "forbidden", "permission", "404", "not found", "invalid"])
-                
-                if should_rotate:
-                    logger.warning(f"🔄 Rotating due to: {last_error}")
-                    current_key_index = (current_key_index + 1) % len(GEMINI_KEYS)
-                    gemini_model = init_gemini_with_key(current_key_index)
-                else:
-                    # If it's a completely different error, log it and try to rotate anyway just in case
-                    logger.error(f"⚠️ Unexpected error with key #{current_key_index+1}: {str(e)}")
-                    current_key_index = (current_key_index + 1) % len(GEMINI_KEYS)
-                    gemini_model = init_gemini_with_key(current_key_index)
-        else:
-            # Current key failed init, move to next
-            current_key_index = (current_key_index + 1) % len(GEMINI_KEYS)
-            gemini_model = init_gemini_with_key(current_key_index)
-
-    raise Exception(f"All Gemini API keys failed or are exhausted. Last error: {last_error}")
+    tried = set()
+    # Each key is tried at most once per request
+    while len(tried) < len(key_pool):
+        key = await key_pool.run(key_pool.acquire, tried)
+        if key is None:
+            break
+        tried.add(key.index)
+        try:
+            model_name = await init_gemini_with_key(key)
+            logger.info(f"🛰️ Calling Gemini with Key #{key.index+1}...")
+            content = await gemini_pool.client(key.index).generate(model_name, prompt_data, generation_config)
+            await report_key_success(key, model_name)
+            return content
+        except Exception as e:
+            last_error = await report_key_error(key, e)
+        finally:
+            await key_pool.run(key_pool.release, key)
+
+    raise keys_exhausted_error(last_error)
+
+async def stream_gemini_robust(prompt_data):
+    """
+    Streaming counterpart of call_gemini_robust: yields text chunks.
+    Keys are only switched before the first chunk; later errors propagate.
+    """
+    admit_gemini_call()
+    try:
+        async for chunk in stream_gemini_keys(prompt_data):
+            yield chunk
+    except (asyncio.CancelledError, GeneratorExit):
+        gemini_breaker.release()
+        raise
+    except Exception:
+        gemini_breaker.record_failure()
+        raise
+    gemini_breaker.record_success()
+
+async def stream_gemini_keys(prompt_data):
+    last_error = ""
+    tried = set()
+    while len(tried) < len(key_pool):
+        key = await key_pool.run(key_pool.acquire, tried)
+        if key is None:
+            break
+        tried.add(key.index)
+        started = False
+        try:
+            model_name = await init_gemini_with_key(key)
+            logger.info(f"🛰️ Streaming from Gemini with Key #{key.index+1}...")
+            async for chunk in gemini_pool.client(key.index).stream(model_name, prompt_data):
+                started = True
+                yield chunk
+            await report_key_success(key, model_name)
+            return
+        except Exception as e:
+            last_error = await report_key_error(key, e)
+            if started:
+                raise
+        finally:
+            await key_pool.run(key_pool.release, key)
+
+    raise keys_exhausted_error(last_error)
+
+# ─────────────────────────────────────────────────────────────
+# Background Warm-up (YOLO weights + Gemini model selection)
+# ─────────────────────────────────────────────────────────────
+gemini_status = BackendStatus("gemini")
+yolo_status = BackendStatus("yolo")
+WARMUP_WAIT_S = float(os.getenv("WARMUP_WAIT_S", "30"))  # Max wait on /detect while nothing is ready
+
+async def warm_up_gemini():
+    if not gemini_available():
+        gemini_status.set(DISABLED, "No Gemini API keys configured")
+        return
+    gemini_status.set(LOADING)
+    last_error = ""
+    for key in key_pool.keys:
+        if key.disabled:
+            continue
+        try:
+            await init_gemini_with_key(key)
+            gemini_status.set(READY, f"Key #{key.index+1} using {key.model}")
+            return
+        except Exception as e:
+            last_error = f"Key #{key.index+1}: {e}"
+            logger.error(f"⚠️ Initialization of {last_error}")
+            if classify_error(e) == "invalid_key":
+                await key_pool.run(key_pool.mark_invalid, key, str(e))
+    gemini_status.set(UNAVAILABLE, last_error)
+
+def preload_models():
+    """
+    Loads the detector synchronously in the current process. Called in the
+    gunicorn master (preload_app) so forked workers share the weights
+    copy-on-write instead of each loading their own.
+    """
+    global model, class_table
+    try:
+        model, class_table = load_yolo_model()
+        yolo_status.set(READY)
+    except Exception as e:
+        print(f"⚠️ Failed to preload YOLOv8 model: {e}")
+
+async def warm_up_yolo():
+    global model, class_table
+    if model is not None:
+        return  # Preloaded before fork
+    yolo_status.set(LOADING)
+    try:
+        model, class_table = await asyncio.to_thread(load_yolo_model)
+        yolo_status.set(READY)
+    except Exception as e:
+        print(f"⚠️ Failed to load YOLOv8 model: {e}")
+        yolo_status.set(UNAVAILABLE, str(e))  # Model stays None, DEMO_MODE will handle it
+
+async def warm_up():
+    await asyncio.gather(warm_up_gemini(), warm_up_yolo())
 
 # ─────────────────────────────────────────────────────────────
 # Smart Fallback Metadata for YOLO (Prevents repetitive text)
@@ -337,6 +692,67 @@ FALLBACK_INSIGHTS = {
     }
 }
 
+# ─────────────────────────────────────────────────────────────
+# Item Metadata Store (per item type, persisted; Gemini only describes new types)
+# ─────────────────────────────────────────────────────────────
+METADATA_DB = os.getenv("METADATA_DB", os.path.join(os.path.dirname(__file__), "data", "item_metadata.sqlite"))
+METADATA_PROMPT_MAX_TYPES = int(os.getenv("METADATA_PROMPT_MAX_TYPES", "40"))
+metadata_store = MetadataStore(METADATA_DB) if METADATA_DB else None  # METADATA_DB="" disables it
+if metadata_store is not None:
+    metadata_store.seed(FALLBACK_INSIGHTS)
+
+
+async def stored_metadata(item_type):
+    """Stored metadata for a type; a miss in memory reads SQLite off the event loop."""
+    if metadata_store is None:
+        return None
+    return metadata_store.cached(item_type) or await asyncio.to_thread(metadata_store.get, item_type)
+
+
+def write_metadata(item_type, metadata):
+    try:
+        metadata_store.put(item_type, metadata)
+    except Exception as e:
+        logger.error(f"Storing metadata for '{item_type}' failed: {e}")
+
+
+def remember_metadata(item_type, metadata):
+    """Stores new metadata in the background: the SQLite write may wait on other workers."""
+    if metadata_store is not None:
+        keep_task(asyncio.create_task(asyncio.to_thread(write_metadata, item_type, metadata)))
+
+# ─────────────────────────────────────────────────────────────
+# Detection Cache (repeat scans of the same item skip the models)
+# ─────────────────────────────────────────────────────────────
+# "exact" (default): only byte-identical uploads hit (sha256 of the file).
+# "perceptual": 256-bit dHash of the decoded image, hits within DETECT_CACHE_MAX_DISTANCE
+#   bits, so re-encoded shots of the same scene hit as well. FALSE-HIT RISK: a different
+#   item on the same fixed background can land within the distance and is then told the
+#   first item's bin. Keep the distance small and only enable it where scenes vary.
+DETECT_CACHE_MATCH = os.getenv("DETECT_CACHE_MATCH", "exact").lower()
+DETECT_CACHE_HASH_SIZE = 16  # 16x16 bits
+detection_cache = DetectionCache(
+    max_entries=int(os.getenv("DETECT_CACHE_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("DETECT_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("DETECT_CACHE_TTL_S", "600")),
+    max_distance=int(os.getenv("DETECT_CACHE_MAX_DISTANCE", "8")) if DETECT_CACHE_MATCH == "perceptual" else 0,
+)
+
+
+def detection_cache_key(image_bytes, prepared):
+    if DETECT_CACHE_MATCH == "perceptual":
+        return dhash(prepared.image, DETECT_CACHE_HASH_SIZE)
+    return content_key(image_bytes)
+
+# ─────────────────────────────────────────────────────────────
+# Local Knowledge Index (answers simple "which bin?" chats without Gemini)
+# ─────────────────────────────────────────────────────────────
+KNOWLEDGE_FILES = [
+    f for f in os.getenv("KNOWLEDGE_FILES", os.path.join(os.path.dirname(__file__), "data", "knowledge_items.json")).split(os.pathsep)
+    if f
+]
+CHAT_FAST_PATH_MAX_WORDS = int(os.getenv("CHAT_FAST_PATH_MAX_WORDS", "12"))
+
 def get_fallback_metadata(class_name):
     name = class_name.lower()
     for key, data in FALLBACK_INSIGHTS.items():
@@ -345,171 +761,712 @@ def get_fallback_metadata(class_name):
     return FALLBACK_INSIGHTS["default"]
 
 
-@app.post("/detect", response_model=DetectionResponse)
-async def detect_waste(image: UploadFile = File(...)):
-    """
-    Detect waste items using Gemini (primary) or YOLO (fallback).
-    """
-    global current_key_index, gemini_model
-    print(f"📥 Received detection request: {image.filename} ({image.content_type})")
+# ─────────────────────────────────────────────────────────────
+# Detection Pipeline
+# ─────────────────────────────────────────────────────────────
+
+DETECTION_PROMPT = """
+    Look at this image. Identify all visible waste items.
     
-    # Read image
-    try:
-        image_bytes = await image.read()
-        pil_image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-        logger.info(f"Image read successful: {image.filename}")
-    except Exception as e:
-        logger.error(f"Image read failed: {e}")
-        if DEMO_MODE: return FALLBACK_DEMO_RESPONSE
-        return DetectionResponse(items=[])
+    Act as a Sustainability Expert. Categorize each item into Recycle, Organic, Hazardous, or Landfill.
+    
+    Return a JSON object with this EXACT structure:
+    {
+        "items": [
+            {
+                "itemType": "Name (e.g. Plastic Water Bottle)",
+                "bin": "Recycle" or "Organic" or "Hazardous" or "Landfill",
+                "contaminated": boolean,
+                "confidence": 0.95,
+                "metadata": {
+                    "transformation": "One sentence on what this becomes after recycling.",
+                    "impact": "One specific impact statistic.",
+                    "fun_fact": "A short, interesting fact about this material."
+                }
+            }
+        ]
+    }
+    
+    IMPORTANT:
+    - Identify EVERY item visible if possible.
+    - If no waste is visible, return an empty items list.
+    - Even if multiple items of same type exist (like 3 bottles), list them as separate items or a single aggregate item with count.
+    - BE BOLD: If it looks like plastic, it's a plastic item for recycling.
+    - Always prefer the full JSON structure.
+    """
 
-    # ─── STRATEGY 1: GEMINI AI (Accurate) ───
-    if gemini_model and GEMINI_API_KEY != "YOUR_API_KEY_HERE":
-        try:
-            logger.info("🧠 Requesting Gemini Pro analysis...")
-            prompt = """
-            Look at this image. Identify all visible waste items.
-            
-            Act as a Sustainability Expert. Categorize each item into Recycle, Organic, Hazardous, or Landfill.
-            
-            Return a JSON object with this EXACT structure:
+# Two-phase mode: detection without the educational metadata, which is generated afterwards
+DETECTION_PROMPT_FAST = """
+    Look at this image. Identify all visible waste items.
+    
+    Act as a Sustainability Expert. Categorize each item into Recycle, Organic, Hazardous, or Landfill.
+    
+    Return a JSON object with this EXACT structure:
+    {
+        "items": [
             {
-                "items": [
-                    {
-                        "itemType": "Name (e.g. Plastic Water Bottle)",
-                        "bin": "Recycle" or "Organic" or "Hazardous" or "Landfill",
-                        "contaminated": boolean,
-                        "confidence": 0.95,
-                        "metadata": {
-                            "transformation": "One sentence on what this becomes after recycling.",
-                            "impact": "One specific impact statistic.",
-                            "fun_fact": "A short, interesting fact about this material."
-                        }
-                    }
-                ]
+                "itemType": "Name (e.g. Plastic Water Bottle)",
+                "bin": "Recycle" or "Organic" or "Hazardous" or "Landfill",
+                "contaminated": boolean,
+                "confidence": 0.95
             }
-            
-            IMPORTANT:
-            - Identify EVERY item visible if possible.
-            - If no waste is visible, return an empty items list.
-            - Even if multiple items of same type exist (like 3 bottles), list them as separate items or a single aggregate item with count.
-            - BE BOLD: If it looks like plastic, it's a plastic item for recycling.
-            - Always prefer the full JSON structure.
-            """
-            
-            # Use the robust caller to handle rotation across ALL keys
-            content = await call_gemini_robust([prompt, pil_image])
-            print(f"📄 Detection Raw Gemini: {content}")
-            
-            # Robust extraction
-            import json
-            import re
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                data = json.loads(json_match.group())
+        ]
+    }
+    
+    IMPORTANT:
+    - Identify EVERY item visible if possible.
+    - If no waste is visible, return an empty items list.
+    - BE BOLD: If it looks like plastic, it's a plastic item for recycling.
+    """
+
+KNOWN_TYPES_NOTE = """
+    Metadata for these item types is already known: {types}.
+    If an item is one of them, use that exact itemType and leave out "metadata".
+    """
+
+
+def detection_prompt():
+    """The full detection prompt, minus metadata for the most common known item types."""
+    if metadata_store is None:
+        return DETECTION_PROMPT
+    known = metadata_store.known_types(METADATA_PROMPT_MAX_TYPES)
+    return DETECTION_PROMPT + KNOWN_TYPES_NOTE.format(types=", ".join(known)) if known else DETECTION_PROMPT
+
+ENRICHMENT_PROMPT = """
+    Act as a Sustainability Expert. For each of these waste items: {items}
+    
+    Return a JSON object with this EXACT structure:
+    {{
+        "items": [
+            {{
+                "itemType": "The item name exactly as given",
+                "metadata": {{
+                    "transformation": "One sentence on what this becomes after recycling.",
+                    "impact": "One specific impact statistic.",
+                    "fun_fact": "A short, interesting fact about this material."
+                }}
+            }}
+        ]
+    }}
+    """
+
+
+async def detect_with_gemini(prepared):
+    """Strategy 1: Gemini AI (accurate). Returns None when it has no usable answer."""
+    try:
+        logger.info("🧠 Requesting Gemini Pro analysis...")
+        # Use the robust caller to handle rotation across ALL keys
+        deferred = DETECT_ENRICHMENT == "deferred"
+        prompt, config = (
+            (DETECTION_PROMPT_FAST, DETECTION_FAST_GENERATION_CONFIG) if deferred
+            else (detection_prompt(), DETECTION_GENERATION_CONFIG)
+        )
+        with stage_seconds.time(endpoint="detect", stage="gemini_call"):
+            content = await call_gemini_robust([prompt, prepared.gemini_jpeg], config)
+        print(f"📄 Detection Raw Gemini: {content}")
+        
+        parse_start = time.perf_counter()
+        data = parse_json(content)
+        
+        # Convert to our internal model
+        detected_items = []
+        for i, item in enumerate(data.get("items", [])):
+            meta = item.get("metadata") or {}
+            if is_complete(meta):
+                remember_metadata(item["itemType"], meta)
             else:
-                data = json.loads(content)
+                # Known type (or deferred mode): stored metadata, else fallback/enrichment later
+                meta = await stored_metadata(item["itemType"]) or ({} if deferred else get_fallback_metadata(item["itemType"]))
             
-            # Convert to our internal model
-            detected_items = []
-            for i, item in enumerate(data.get("items", [])):
-                meta = item.get("metadata", {})
-                
-                detected_items.append(DetectedItem(
-                    id=i+1,
-                    itemType=item["itemType"],
-                    bin=item["bin"],
-                    contaminated=item.get("contaminated", False),
-                    confidence=item.get("confidence", 0.9),
-                    bbox=BoundingBox(x=0, y=0, w=0, h=0),
-                    metadata=meta
-                ))
+            detected_items.append(DetectedItem(
+                id=i+1,
+                itemType=item["itemType"],
+                bin=item["bin"],
+                contaminated=item.get("contaminated", False),
+                confidence=item.get("confidence", 0.9),
+                bbox=BoundingBox(x=0, y=0, w=0, h=0),
+                metadata=meta
+            ))
+        stage_seconds.observe(time.perf_counter() - parse_start, endpoint="detect", stage="json_parse")
+        
+        if detected_items:
+            print(f"✅ Gemini Found: {[d.itemType for d in detected_items]}")
+            response = DetectionResponse(items=detected_items)
+            if deferred and not all(d.metadata for d in detected_items):
+                response.enrichmentId = enrichment_jobs.submit(lambda: enrich_items(response))
+            return response
+        print("🧠 Gemini returned empty items list.")
             
-            if detected_items:
-                print(f"✅ Gemini Found: {[d.itemType for d in detected_items]}")
-                return DetectionResponse(items=detected_items)
+    except Exception as e:
+        error_msg = f"❌ Gemini Error: {str(e)}"
+        print(error_msg)
+        logger.error(error_msg)
+        errors_total.inc(type="detect_gemini")
+    return None
+
+
+async def enrich_items(response):
+    """
+    Background half of two-phase detection: generates the metadata for the
+    detected items (text only, no image) and fills it into `response`, which
+    is also the object held by the detection cache.
+    """
+    names = list(dict.fromkeys(item.itemType for item in response.items if not item.metadata))
+    with stage_seconds.time(endpoint="enrich", stage="gemini_call"):
+        content = await call_gemini_robust(ENRICHMENT_PROMPT.format(items=", ".join(names)), ENRICHMENT_GENERATION_CONFIG)
+    by_name = {}
+    for entry in parse_json(content).get("items", []):
+        if is_complete(entry.get("metadata")):
+            by_name[normalize(entry["itemType"])] = entry["metadata"]
+    for item in response.items:
+        if not item.metadata and normalize(item.itemType) in by_name:
+            item.metadata = by_name[normalize(item.itemType)]
+            remember_metadata(item.itemType, item.metadata)
+        item.metadata = item.metadata or get_fallback_metadata(item.itemType)
+    return [ItemEnrichment(id=item.id, itemType=item.itemType, metadata=item.metadata) for item in response.items]
+
+
+async def detect_with_local(prepared):
+    """Strategy 2: YOLOv8 (fallback). Returns None when nothing was found."""
+    if not model:
+        return None
+    try:
+        print("🚀 Starting YOLOv8 fallback...")
+        with stage_seconds.time(endpoint="detect", stage="yolo_inference"):
+            result = await yolo_executor.submit(prepared.image)
+        
+        postprocess_start = time.perf_counter()
+        # Threshold, people filter and top-k on whole arrays; only survivors become objects
+        keep = class_table.select(result, YOLO_CONF_THRESHOLD, YOLO_MAX_ITEMS)
+        boxes = result.boxes[keep] * prepared.scale  # Back to original image coordinates
+        xywh = np.concatenate([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]], axis=1).astype(int)
+        detected_items = []
+        for (x, y, w, h), conf, class_id in zip(xywh.tolist(), result.scores[keep].tolist(), result.class_ids[keep].tolist()):
+            info = class_table.infos[class_id]
+            detected_items.append(DetectedItem(
+                id=len(detected_items) + 1,
+                itemType=info.name,
+                bin=info.bin,
+                contaminated=info.contaminated,
+                confidence=conf,
+                bbox=BoundingBox(x=x, y=y, w=w, h=h),
+                metadata=info.metadata
+            ))
+        
+        stage_seconds.observe(time.perf_counter() - postprocess_start, endpoint="detect", stage="yolo_postprocess")
+        if detected_items:
+            print(f"✅ YOLO Found: {[d.itemType for d in detected_items]}")
+            return DetectionResponse(items=detected_items)
+        
+        print("🚀 YOLO found nothing.")
+        
+    except Exception as e:
+        print(f"❌ YOLO Error: {e}")
+        logger.error(f"YOLO fallback failed: {e}")
+        errors_total.inc(type="detect_yolo")
+    return None
+
+
+# ─── Metadata enrichment ───
+# "inline": Gemini returns the metadata with the detection (default)
+# "deferred": /detect returns as soon as items are detected; metadata comes from GET /enrich/{enrichmentId}
+#   Jobs live in the memory of the worker that ran /detect, so deferred mode needs a single worker
+DETECT_ENRICHMENT = os.getenv("DETECT_ENRICHMENT", "inline").lower()
+if DETECT_ENRICHMENT == "deferred" and int(os.getenv("WEB_CONCURRENCY") or 1) > 1:
+    raise RuntimeError(
+        "DETECT_ENRICHMENT=deferred keeps enrichment jobs in per-worker memory, so GET /enrich would "
+        "miss jobs started by other workers: run a single worker (WEB_CONCURRENCY=1) or use inline enrichment"
+    )
+enrichment_jobs = EnrichmentJobs(
+    max_jobs=int(os.getenv("ENRICH_MAX_JOBS", "1024")),
+    ttl_seconds=float(os.getenv("ENRICH_TTL_S", "600")),
+)
+
+# ─── Strategy selection ───
+# "gemini_first": Gemini, then YOLO if Gemini fails (default)
+# "hedged": start YOLO in parallel once DETECT_HEDGE_AT of the latency budget is spent; first valid result wins
+# "local_first": YOLO, escalating to Gemini only when its answer is not good enough (see escalation_reason)
+DETECT_STRATEGY = os.getenv("DETECT_STRATEGY", "gemini_first").lower()
+DETECT_LATENCY_BUDGET_MS = float(os.getenv("DETECT_LATENCY_BUDGET_MS", "4000"))
+DETECT_HEDGE_AT = float(os.getenv("DETECT_HEDGE_AT", "0.6"))
+DETECT_HEDGE_FILL_CACHE = os.getenv("DETECT_HEDGE_FILL_CACHE", "1") == "1"  # Late Gemini answers refresh the cache
+LOCAL_FIRST_MIN_CONFIDENCE = float(os.getenv("LOCAL_FIRST_MIN_CONFIDENCE", "0.6"))
+LOCAL_FIRST_REQUIRE_MAPPED = os.getenv("LOCAL_FIRST_REQUIRE_MAPPED", "1") == "1"  # Escalate classes missing from BIN_MAPPING
+
+background_tasks = set()
+
+
+def keep_task(task):
+    """Holds a reference to a fire-and-forget task until it finishes."""
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+
+def finish_gemini_in_background(gemini_task, image_hash):
+    """Lets a losing Gemini call complete and store its (better) answer for the next scan."""
+    def store(task):
+        if not task.cancelled() and task.exception() is None and task.result() is not None:
+            detection_cache.put(image_hash, task.result())
+            print("🧠 Late Gemini result cached")
+    gemini_task.add_done_callback(store)
+    keep_task(gemini_task)
+
+
+async def detect_hedged(prepared, image_hash):
+    """
+    Gemini with a latency budget: once DETECT_HEDGE_AT of the budget is used,
+    the local detector runs in parallel and the first valid result wins.
+    Past the budget only the local detector is awaited, so latency stays bounded.
+    Returns (response or None, source).
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + DETECT_LATENCY_BUDGET_MS / 1000
+    gemini_task = asyncio.create_task(detect_with_gemini(prepared))
+    local_task = None
+    try:
+        await asyncio.wait({gemini_task}, timeout=DETECT_LATENCY_BUDGET_MS * DETECT_HEDGE_AT / 1000)
+        if gemini_task.done() and gemini_task.result() is not None:
+            return gemini_task.result(), "gemini"
+
+        print("⏱️ Latency budget running low, hedging with YOLOv8...")
+        local_task = asyncio.create_task(detect_with_local(prepared))
+        pending = {local_task} if gemini_task.done() else {gemini_task, local_task}
+        while pending:
+            timeout = deadline - loop.time()
+            if gemini_task not in pending:
+                timeout = None  # Only the (bounded) local detector left
+            elif timeout <= 0:
+                pending.discard(gemini_task)
+                continue
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.result() is not None:
+                    print(f"🏁 Hedge won by {'Gemini' if task is gemini_task else 'YOLOv8'}")
+                    return task.result(), "gemini" if task is gemini_task else "local"
+        return None, "none"
+    finally:
+        if local_task and not local_task.done():
+            local_task.cancel()
+        if not gemini_task.done():
+            if DETECT_HEDGE_FILL_CACHE:
+                finish_gemini_in_background(gemini_task, image_hash)
             else:
-                print("🧠 Gemini returned empty items list.")
-                
-        except Exception as e:
-            error_msg = f"❌ Gemini Error: {str(e)}"
-            print(error_msg)
-            logger.error(error_msg)
-            # Proceed to YOLO fallback
-            pass
+                gemini_task.cancel()
+
+
+def escalation_reason(response):
+    """Why a local detection should be re-checked by Gemini, or None when it can be served as is."""
+    if response is None or not response.items:
+        return "nothing_found"
+    if min(item.confidence for item in response.items) < LOCAL_FIRST_MIN_CONFIDENCE:
+        return "low_confidence"
+    if LOCAL_FIRST_REQUIRE_MAPPED and any(item.itemType.lower() not in BIN_MAPPING for item in response.items):
+        return "unmapped_class"
+    return None
+
 
+async def detect_local_first(prepared, use_gemini):
+    """YOLO first; Gemini only for scenes the local model is unsure about. Returns (response or None, source)."""
+    local = await detect_with_local(prepared)
+    reason = escalation_reason(local)
+    if reason is None:
+        return local, "local"
+    if use_gemini:
+        print(f"⬆️ Escalating to Gemini ({reason})")
+        detect_escalations.inc(reason=reason)
+        response = await detect_with_gemini(prepared)
+        if response is not None:
+            return response, "gemini"
+    return local, "local" if local is not None else "none"
 
-    # ─── STRATEGY 2: YOLOv8 (Fallback) ───
-    if model:
+
+async def check_frame(image_bytes: bytes, endpoint: str):
+    """Frame-quality gate; returns the rejection reason or None. Undecodable frames are left to the pipeline."""
+    if not FRAME_GATE:
+        return None
+    with stage_seconds.time(endpoint=endpoint, stage="frame_gate"):
         try:
-            print("🚀 Starting YOLOv8 fallback...")
-            results = model(pil_image, device="cpu", verbose=False)
-            
-            detected_items = []
-            for result in results:
-                for box in result.boxes:
-                    try:
-                        conf = float(box.conf[0])
-                        if conf < 0.25: continue
-                        
-                        class_id = int(box.cls[0])
-                        class_name = model.names[class_id]
-
-                        # 🛑 EXPLICIT FILTER: Ignore people
-                        if class_name.lower() in ['person', 'face', 'hand', 'man', 'woman']:
-                            continue
-                        
-                        x1, y1, x2, y2 = box.xyxy[0].tolist()
-                        
-                        # Enrich with SMART metadata for YOLO findings
-                        item_meta = get_fallback_metadata(class_name)
-
-                        detected_items.append(DetectedItem(
-                            id=len(detected_items) + 1,
-                            itemType=class_name.capitalize(),
-                            bin=get_bin_for_item(class_name),
-                            contaminated=is_contaminated(class_name),
-                            confidence=conf,
-                            bbox=BoundingBox(x=int(x1), y=int(y1), w=int(x2-x1), h=int(y2-y1)),
-                            metadata=item_meta
-                        ))
-                    except Exception as box_err:
-                        print(f"⚠️ Box processing error: {box_err}")
-                        continue
-            
-            if detected_items:
-                detected_items.sort(key=lambda x: x.confidence, reverse=True)
-                print(f"✅ YOLO Found: {[d.itemType for d in detected_items]}")
-                return DetectionResponse(items=detected_items[:3])
-            
-            print("🚀 YOLO found nothing.")
-            
-        except Exception as e:
-            print(f"❌ YOLO Error: {e}")
-            logger.error(f"YOLO fallback failed: {e}")
+            thumbnail = await asyncio.to_thread(decode_thumbnail, image_bytes, FRAME_GATE_SIZE)
+        except Exception:
+            return None
+        reason = frame_gate.check(thumbnail)
+    if reason is not None:
+        print(f"🙈 Frame rejected: {reason}")
+        frames_rejected.inc(endpoint=endpoint, reason=reason)
+    return reason
+
+
+def live_frame_check(data: bytes):
+    """Quality gate for live-scan keyframes (repeated keyframes reuse their result, see live_scan)."""
+    if not FRAME_GATE:
+        return None
+    reason = frame_gate.check(decode_thumbnail(data, FRAME_GATE_SIZE))
+    if reason is not None:
+        frames_rejected.inc(endpoint="ws_scan", reason=reason)
+    return reason
+
+
+async def run_detection(image_bytes: bytes, filename: str = "") -> DetectionResponse:
+    """
+    Full detection pipeline for one upload: decode, cache, Gemini, then YOLO.
+    Shared by /detect, /detect/batch and the live-scan socket. Concurrent
+    requests for byte-identical images share a single pipeline run.
+    """
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    return await detect_flights.do(digest, lambda: run_detection_pipeline(image_bytes, filename))
+
+
+async def run_detection_pipeline(image_bytes: bytes, filename: str = "") -> DetectionResponse:
+    with stage_seconds.time(endpoint="detect", stage="total"):
+        response, source = await detect_pipeline_stages(image_bytes, filename)
+    detections_total.inc(source=source)
+    # Shallow copy: the cached object (and its items, filled in by deferred enrichment) stays shared
+    return response.model_copy(update={"source": source})
+
+
+async def detect_pipeline_stages(image_bytes: bytes, filename: str):
+    """Returns (response, source) where source names the path that served it."""
+    # Decode + downscale once per backend off the event loop
+    try:
+        with stage_seconds.time(endpoint="detect", stage="decode"):
+            prepared = await asyncio.to_thread(
+                prepare_image, image_bytes, YOLO_INPUT_SIZE, GEMINI_IMAGE_MAX_SIDE, GEMINI_JPEG_QUALITY
+            )
+        logger.info(f"Image read successful: {filename} {prepared.original_size} -> {prepared.image.size}")
+    except Exception as e:
+        logger.error(f"Image read failed: {e}")
+        errors_total.inc(type="decode")
+        if DEMO_MODE: return FALLBACK_DEMO_RESPONSE, "demo"
+        return DetectionResponse(items=[]), "none"
+
+    with stage_seconds.time(endpoint="detect", stage="cache_lookup"):
+        image_hash = await asyncio.to_thread(detection_cache_key, image_bytes, prepared)
+        cached = detection_cache.get(image_hash)
+    if cached is not None:
+        print(f"⚡ Cache hit: {[d.itemType for d in cached.items]}")
+        return cached, "cache"
+
+    # Cold start: serve from whichever backend finishes warming up first
+    await wait_for_first_ready([gemini_status, yolo_status], WARMUP_WAIT_S)
+    skip_gemini = gemini_status.warming and yolo_status.ready
+
+    response, source = None, "none"
+    use_gemini = gemini_reachable() and not skip_gemini
+    if use_gemini and model and DETECT_STRATEGY == "hedged":
+        response, source = await detect_hedged(prepared, image_hash)
+    elif model and DETECT_STRATEGY == "local_first":
+        response, source = await detect_local_first(prepared, use_gemini)
+    else:
+        if use_gemini:
+            response, source = await detect_with_gemini(prepared), "gemini"
+        if response is None:
+            response, source = await detect_with_local(prepared), "local"
+    if response is not None:
+        detection_cache.put(image_hash, response)
+        return response, source
 
     if DEMO_MODE:
         print("🎁 Returning FALLBACK_DEMO_RESPONSE")
-        return FALLBACK_DEMO_RESPONSE
-    return DetectionResponse(items=[])
+        return FALLBACK_DEMO_RESPONSE, "demo"
+    return DetectionResponse(items=[]), "none"
+
+
+# Request coalescing: identical in-flight /detect images and /chat questions share one call
+detect_flights = SingleFlight()
+chat_flights = SingleFlight()
+
+item_index = ItemIndex.build(BIN_MAPPING, CONTAMINATION_ITEMS, FALLBACK_INSIGHTS, KNOWLEDGE_FILES)
+
+
+# Scrape-time views of component state
+def key_status_counts():
+    counts = {(status,): 0 for status in ("healthy", "cooling", "disabled")}
+    for key in key_pool.snapshot():
+        counts[(key["status"],)] += 1
+    return counts
+
+
+metrics.callback("waste_detect_cache_lookups_total", "Detection cache lookups by result",
+                 lambda: {("hit",): detection_cache.hits, ("miss",): detection_cache.misses},
+                 ["result"], kind="counter")
+metrics.callback("waste_detect_cache_hit_ratio", "Detection cache hit ratio", lambda: detection_cache.stats()["hit_rate"])
+metrics.callback("waste_detect_cache_entries", "Detection cache entries", lambda: detection_cache.stats()["entries"])
+metrics.callback("waste_detect_cache_bytes", "Approximate detection cache size in bytes", lambda: detection_cache.stats()["bytes"])
+metrics.callback("waste_singleflight_calls_total", "Coalesced endpoint calls by outcome",
+                 lambda: {
+                     ("detect", "started"): detect_flights.started, ("detect", "coalesced"): detect_flights.coalesced,
+                     ("chat", "started"): chat_flights.started, ("chat", "coalesced"): chat_flights.coalesced,
+                 },
+                 ["endpoint", "outcome"], kind="counter")
+metrics.callback("waste_gemini_keys", "Gemini API keys by scheduler status", key_status_counts, ["status"])
+metrics.callback("waste_gemini_circuit_open", "1 while the Gemini circuit breaker is open or half-open",
+                 lambda: 0 if gemini_breaker.state == "closed" else 1)
+metrics.callback("waste_gemini_circuit_trips_total", "Times the Gemini circuit breaker opened",
+                 lambda: gemini_breaker.opened, kind="counter")
+metrics.callback("waste_admission_queue", "Requests holding or waiting for an admission slot",
+                 lambda: {
+                     (queue.name, state): queue.stats()[state]
+                     for queue in (detect_queue, chat_queue) for state in ("running", "waiting")
+                 },
+                 ["endpoint", "state"])
+
+
+@app.post("/detect", response_model=DetectionResponse)
+async def detect_waste(request: Request, response: Response, image: UploadFile = File(...)):
+    """
+    Detect waste items using Gemini (primary) or YOLO (fallback).
+    """
+    print(f"📥 Received detection request: {image.filename} ({image.content_type})")
+    try:
+        client_limiter.check(client_id(request))
+    except Rejected as e:
+        raise admission_error("detect", e)
+    
+    # Read image (bounded)
+    try:
+        with stage_seconds.time(endpoint="detect", stage="read"):
+            image_bytes = await read_upload(image, MAX_UPLOAD_BYTES)
+    except UploadTooLarge as e:
+        errors_total.inc(type="upload_too_large")
+        raise HTTPException(status_code=413, detail=str(e))
+
+    rejected = await check_frame(image_bytes, "detect")
+    if rejected is not None:
+        detections_total.inc(source="rejected")
+        result = DetectionResponse(items=[], source="rejected", rejected=rejected)
+        response.headers["X-Detection-Source"] = result.source
+        return result
+    try:
+        async with detect_queue.slot(PRIORITY_INTERACTIVE):
+            result = await run_detection(image_bytes, image.filename)
+    except Rejected as e:
+        raise admission_error("detect", e)
+    response.headers["X-Detection-Source"] = result.source
+    return result
+
+
+@app.get("/enrich/{enrichment_id}", response_model=EnrichmentResponse)
+async def get_enrichment(enrichment_id: str):
+    """
+    Educational metadata for a deferred-enrichment detection. `status` stays
+    "pending" until the background job finishes; poll again after a moment.
+    """
+    job = enrichment_jobs.get(enrichment_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired enrichment id")
+    return EnrichmentResponse(
+        enrichmentId=enrichment_id, status=job.status, items=job.result or [], error=job.error or None
+    )
+
+
+# ─────────────────────────────────────────────────────────────
+# Batch Detection (NDJSON stream, one DetectionResponse per line)
+# ─────────────────────────────────────────────────────────────
+DETECT_BATCH_CONCURRENCY = int(os.getenv("DETECT_BATCH_CONCURRENCY", "4"))
+DETECT_BATCH_MAX_IMAGES = int(os.getenv("DETECT_BATCH_MAX_IMAGES", "200"))
+ZIP_CONTENT_TYPES = {"application/zip", "application/x-zip-compressed"}
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+class BatchDetectionResult(DetectionResponse):
+    index: int
+    filename: str
+    error: str | None = None
+
+
+def list_batch_sources(uploads):
+    """
+    Expands the uploads into (filename, loader) pairs; zip archives contribute
+    one entry per image member. Loaders are async and read lazily.
+    """
+    sources = []
+    for upload in uploads:
+        is_zip = upload.content_type in ZIP_CONTENT_TYPES or (upload.filename or "").lower().endswith(".zip")
+        if not is_zip:
+            sources.append((upload.filename, lambda u=upload: read_upload(u, MAX_UPLOAD_BYTES)))
+            continue
+        archive = zipfile.ZipFile(upload.file)
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(IMAGE_SUFFIXES):
+                continue
+            sources.append((info.filename, lambda a=archive, i=info: read_zip_member(a, i)))
+    return sources
+
+
+async def read_zip_member(archive, info):
+    if info.file_size > MAX_UPLOAD_BYTES:
+        raise UploadTooLarge(f"{info.filename} is {info.file_size} bytes (limit {MAX_UPLOAD_BYTES})")
+    return await asyncio.to_thread(archive.read, info)
+
+
+@app.post("/detect/batch")
+async def detect_batch(request: Request, images: list[UploadFile] = File(...)):
+    """
+    Detect waste in many images (files and/or zip archives) in one request.
+    Results stream back as NDJSON in completion order; `index` refers to the
+    position of the image in the request.
+    """
+    try:
+        sources = list_batch_sources(images)
+    except zipfile.BadZipFile as e:
+        raise HTTPException(status_code=400, detail=f"Invalid zip archive: {e}")
+    if len(sources) > DETECT_BATCH_MAX_IMAGES:
+        raise HTTPException(status_code=413, detail=f"Batch has {len(sources)} images (limit {DETECT_BATCH_MAX_IMAGES})")
+    client = client_id(request)
+    try:
+        client_limiter.check(client)  # The first image; the others are charged as they start
+        if detect_queue.full():
+            raise QueueFull("detect queue is full", detect_queue.retry_after())
+    except Rejected as e:
+        raise admission_error("detect_batch", e)
+    print(f"📥 Received batch detection request: {len(sources)} images")
+
+    async def charge(index):
+        # Every image costs one request of the client's quota: a big batch is paced, not waved through
+        while index > 0:
+            try:
+                client_limiter.check(client)
+                return
+            except RateLimited as e:
+                await asyncio.sleep(e.retry_after)
+
+    async def detect_bulk(image_bytes, filename):
+        # Batch images queue behind interactive scans; when pushed out, back off and retry
+        while True:
+            try:
+                async with detect_queue.slot(PRIORITY_BULK):
+                    return await run_detection(image_bytes, filename)
+            except QueueFull as e:
+                await asyncio.sleep(e.retry_after)
+
+    async def process(index, filename, load):
+        try:
+            await charge(index)
+            response = await detect_bulk(await load(), filename)
+            return BatchDetectionResult(index=index, filename=filename, items=response.items, source=response.source)
+        except Exception as e:
+            logger.error(f"Batch item {index} ({filename}) failed: {e}")
+            return BatchDetectionResult(index=index, filename=filename, items=[], error=str(e))
+
+    async def stream():
+        pending = iter(enumerate(sources))
+        results = asyncio.Queue()
+
+        async def worker():
+            for index, (filename, load) in pending:
+                await results.put(await process(index, filename, load))
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(DETECT_BATCH_CONCURRENCY, len(sources)))]
+        try:
+            for _ in range(len(sources)):
+                result = await results.get()
+                yield result.model_dump_json() + "\n"
+        finally:
+            # Client went away (or we are done): stop the remaining work
+            for w in workers:
+                w.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+# ─────────────────────────────────────────────────────────────
+# Live Scan (WebSocket: keyframe detection + cross-frame tracking)
+# ─────────────────────────────────────────────────────────────
+LIVE_MIN_KEYFRAME_INTERVAL = int(os.getenv("LIVE_MIN_KEYFRAME_INTERVAL", "2"))
+LIVE_MAX_KEYFRAME_INTERVAL = int(os.getenv("LIVE_MAX_KEYFRAME_INTERVAL", "16"))
+LIVE_SCENE_CHANGE_DISTANCE = int(os.getenv("LIVE_SCENE_CHANGE_DISTANCE", "10"))
+live_session_ids = itertools.count(1)
+
+
+def live_frame_hash(data: bytes) -> int:
+    return dhash(decode_thumbnail(data))
+
+
+@app.websocket("/ws/scan")
+async def live_scan(websocket: WebSocket):
+    """
+    Continuous scanning: send JPEG frames as binary messages, receive one JSON
+    message per processed frame with tracked items (stable ids) and whether
+    it was a keyframe.
+    """
+    await websocket.accept()
+    print("📡 Live scan session started")
+    client = client_id(websocket)
+    session_key = f"{client}#{next(live_session_ids)}"
+
+    async def detect(data: bytes) -> DetectionResponse:
+        # A keyframe repeating one served a moment ago (camera held still) gets that result again
+        thumbnail = None
+        if FRAME_GATE:
+            try:
+                thumbnail = await asyncio.to_thread(decode_thumbnail, data, FRAME_GATE_SIZE)
+            except Exception:
+                pass
+        if thumbnail is not None:
+            previous = frame_gate.recent_result(session_key, thumbnail)
+            if previous is not None:
+                live_repeats_reused.inc()
+                return previous
+        # Other keyframes are admitted like /detect uploads; a refusal keeps the tracked items
+        try:
+            client_limiter.check(client)
+            async with detect_queue.slot(PRIORITY_INTERACTIVE):
+                response = await run_detection(data)
+        except Rejected as e:
+            admission_rejections.inc(endpoint="ws_scan", reason="rate_limited" if isinstance(e, RateLimited) else "queue_full")
+            raise
+        if thumbnail is not None and response.source != "none":
+            frame_gate.remember(session_key, thumbnail, response)  # Only results worth repeating
+        return response
+
+    session = LiveScanSession(
+        detect=detect,
+        frame_hash=live_frame_hash,
+        min_interval=LIVE_MIN_KEYFRAME_INTERVAL,
+        max_interval=LIVE_MAX_KEYFRAME_INTERVAL,
+        scene_change_distance=LIVE_SCENE_CHANGE_DISTANCE,
+        max_frame_bytes=MAX_UPLOAD_BYTES,
+        frame_check=live_frame_check,
+    )
+    try:
+        await session.run(websocket)
+    finally:
+        frame_gate.forget(session_key)
+    print(f"📡 Live scan session ended ({session.received} frames, {session.dropped} dropped)")
 
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat_assistant(request: ChatRequest):
+async def chat_assistant(request: ChatRequest, http_request: Request):
     """
     AI Assistant to answer waste related questions using Gemini.
+    Simple "which bin does X go in" questions are answered from the local item index.
     """
-    global current_key_index, gemini_model
-    if not gemini_model or GEMINI_API_KEY == "YOUR_API_KEY_HERE":
-        return ChatResponse(
-            response="I'm currently in offline mode. Please check my API configuration.",
-            binSuggestion="Landfill"
-        )
+    with stage_seconds.time(endpoint="chat", stage="fast_path"):
+        match = item_index.answer(request.query, CHAT_FAST_PATH_MAX_WORDS)
+    if match is not None:
+        print(f"⚡ Chat fast path: '{match.phrase}' -> {match.item.bin}")
+        chat_answers_total.inc(source="fast_path")
+        return ChatResponse(response=ItemIndex.format_answer(match), binSuggestion=match.item.bin)
+
+    if not gemini_reachable():
+        return ChatResponse(response=offline_chat_text(), binSuggestion="Landfill")
+
+    # Identical questions in flight at the same time share one Gemini call
+    try:
+        client_limiter.check(client_id(http_request))
+        async with chat_queue.slot(PRIORITY_INTERACTIVE):
+            with stage_seconds.time(endpoint="chat", stage="total"):
+                return await chat_flights.do(normalize(request.query), lambda: ask_gemini_chat(request.query))
+    except Rejected as e:
+        raise admission_error("chat", e)
+
 
+async def ask_gemini_chat(query: str) -> ChatResponse:
     try:
         prompt = f"""
         You are 'Eco-Scrutinize AI', a friendly and expert sustainability assistant.
-        The user is asking: "{request.query}"
+        The user is asking: "{query}"
         
         Provide a concise, helpful answer (max 3 sentences). 
         Identify if they are asking about a specific item and suggest the correct bin.
@@ -522,28 +1479,24 @@ async def chat_assistant(request: ChatRequest):
         """
         
         # Use the robust caller to handle rotation across ALL keys
-        content = await call_gemini_robust(prompt)
+        with stage_seconds.time(endpoint="chat", stage="gemini_call"):
+            content = await call_gemini_robust(prompt, CHAT_GENERATION_CONFIG)
         print(f"📄 Raw Gemini Response: {content}")
         
-        # Robust JSON extraction
-        import json
-        import re
-        
         try:
-            # Try to find JSON block
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                data = json.loads(json_match.group())
-            else:
-                data = json.loads(content)
+            with stage_seconds.time(endpoint="chat", stage="json_parse"):
+                data = parse_json(content)
         except Exception as json_err:
             print(f"⚠️ JSON Parse Error: {json_err}")
+            errors_total.inc(type="chat_json")
+            chat_answers_total.inc(source="gemini_text")
             # Fallback if AI didn't return JSON
             return ChatResponse(
                 response=content.strip()[:200], # Just return raw text if small
                 binSuggestion="Landfill"
             )
         
+        chat_answers_total.inc(source="gemini")
         return ChatResponse(
             response=data.get("response", "I'm here to help!"),
             binSuggestion=data.get("binSuggestion", "Landfill")
@@ -551,19 +1504,111 @@ async def chat_assistant(request: ChatRequest):
     except Exception as e:
         error_str = str(e)
         print(f"❌ Chat Assistant Error: {error_str}")
-        
-        if "429" in error_str or "ResourceExhausted" in error_str:
-            friendly_err = "I'm a bit overwhelmed with requests right now. Please wait about 60 seconds and try again!"
-        elif "404" in error_str:
-            friendly_err = "I'm having trouble finding my knowledge base. (Error 404)"
-        else:
-            friendly_err = f"I'm having trouble connecting to my brain. (Detail: {error_str[:50]})"
-            
+        errors_total.inc(type="chat_gemini")
+        chat_answers_total.inc(source="error")
         return ChatResponse(
-            response=friendly_err,
+            response=friendly_chat_error(error_str),
             binSuggestion="Landfill"
         )
 
+
+def offline_chat_text():
+    """Answer when Gemini is not called at all: not configured, or skipped by the circuit breaker."""
+    if gemini_available():
+        chat_answers_total.inc(source="circuit_open")
+        return temporarily_unavailable_text(gemini_breaker.retry_after())
+    chat_answers_total.inc(source="offline")
+    return "I'm currently in offline mode. Please check my API configuration."
+
+
+def temporarily_unavailable_text(retry_after):
+    return f"My AI service is temporarily unavailable. Please try again in about {max(1, math.ceil(retry_after))} seconds."
+
+
+def friendly_chat_error(error_str):
+    if "circuit is open" in error_str:
+        return temporarily_unavailable_text(gemini_breaker.retry_after())
+    if "429" in error_str or "ResourceExhausted" in error_str:
+        return "I'm a bit overwhelmed with requests right now. Please wait about 60 seconds and try again!"
+    elif "404" in error_str:
+        return "I'm having trouble finding my knowledge base. (Error 404)"
+    return f"I'm having trouble connecting to my brain. (Detail: {error_str[:50]})"
+
+
+@app.post("/chat/stream")
+async def chat_assistant_stream(request: ChatRequest, http_request: Request):
+    """
+    Streaming variant of /chat (server-sent events).
+    Emits `token` events with answer text as Gemini generates it, then a final
+    `done` event carrying the full response and binSuggestion.
+    """
+    match = item_index.answer(request.query, CHAT_FAST_PATH_MAX_WORDS)
+    if match is None and gemini_reachable():
+        # Refuse before the stream starts; the slot itself is taken inside the stream
+        try:
+            client_limiter.check(client_id(http_request))
+            if chat_queue.full():
+                raise QueueFull("chat queue is full", chat_queue.retry_after())
+        except Rejected as e:
+            raise admission_error("chat_stream", e)
+
+    async def events():
+        if match is not None:
+            chat_answers_total.inc(source="fast_path")
+            text = ItemIndex.format_answer(match)
+            yield sse_event("token", {"text": text})
+            yield sse_event("done", {"response": text, "binSuggestion": match.item.bin})
+            return
+
+        if not gemini_reachable():
+            text = offline_chat_text()
+            yield sse_event("token", {"text": text})
+            yield sse_event("done", {"response": text, "binSuggestion": "Landfill"})
+            return
+
+        prompt = f"""
+        You are 'Eco-Scrutinize AI', a friendly and expert sustainability assistant.
+        The user is asking: "{request.query}"
+        
+        Provide a concise, helpful answer (max 3 sentences) in plain text.
+        Identify if they are asking about a specific item and suggest the correct bin.
+        
+        After the answer, on its own final line, write exactly:
+        BIN: Recycle or Organic or Hazardous or Landfill
+        """
+        bin_filter = BinLineFilter()
+        try:
+            async with chat_queue.slot(PRIORITY_INTERACTIVE):
+                async for chunk in stream_gemini_robust(prompt):
+                    text = bin_filter.feed(chunk)
+                    if text:
+                        yield sse_event("token", {"text": text})
+            text = bin_filter.finish()
+            if text:
+                yield sse_event("token", {"text": text})
+            chat_answers_total.inc(source="gemini_stream")
+            yield sse_event("done", {
+                "response": bin_filter.text.strip(),
+                "binSuggestion": parse_bin(bin_filter.bin_line or ""),
+            })
+        except Exception as e:
+            error_str = str(e)
+            print(f"❌ Chat Stream Error: {error_str}")
+            errors_total.inc(type="chat_stream")
+            chat_answers_total.inc(source="error")
+            yield sse_event("error", {"message": friendly_chat_error(error_str)})
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,100 @@
+"""
+Persistent per-item-type metadata (transformation / impact / fun_fact).
+
+Entries live in SQLite keyed by the normalised item type, are seeded from the
+built-in insights and filled in as Gemini describes new items. Known types are
+listed in the detection prompt so Gemini can skip their metadata. Reads are
+served from an in-memory copy (`cached`); a miss falls through to the
+database (`get`), which picks up entries written by other worker processes.
+`get` and `put` may wait on another process's write: call them from async
+code through `asyncio.to_thread`.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from backend.knowledge import normalize
+
+METADATA_FIELDS = ("transformation", "impact", "fun_fact")
+
+
+def is_complete(metadata) -> bool:
+    return isinstance(metadata, dict) and all(metadata.get(f) for f in METADATA_FIELDS)
+
+
+class MetadataStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()  # One connection per thread (and per process)
+        self._entries: dict[str, tuple[str, dict]] = {}  # key -> (display name, metadata)
+        self.hits = Counter()
+        db = self._connection()
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS item_metadata ("
+            "key TEXT PRIMARY KEY, item_type TEXT, metadata TEXT, source TEXT, updated REAL)"
+        )
+        for key, item_type, metadata in db.execute("SELECT key, item_type, metadata FROM item_metadata"):
+            self._entries[key] = (item_type, json.loads(metadata))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections must not cross a fork or be shared between threads
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def seed(self, insights: dict):
+        """Adds built-in entries for types the store does not know yet."""
+        for item_type, metadata in insights.items():
+            if item_type != "default" and normalize(item_type) not in self._entries:
+                self.put(item_type.capitalize(), metadata, source="seed")
+
+    def cached(self, item_type: str) -> dict | None:
+        """In-memory lookup only: never touches the database."""
+        key = normalize(item_type)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self.hits[key] += 1
+        return entry[1]
+
+    def get(self, item_type: str) -> dict | None:
+        """In-memory lookup, falling back to the database (blocking)."""
+        key = normalize(item_type)
+        entry = self._entries.get(key)
+        if entry is None:
+            row = self._connection().execute(
+                "SELECT item_type, metadata FROM item_metadata WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            entry = self._entries[key] = (row[0], json.loads(row[1]))
+        self.hits[key] += 1
+        return entry[1]
+
+    def put(self, item_type: str, metadata: dict, source: str = "gemini"):
+        """Stores an entry in memory and in the database (blocking)."""
+        key = normalize(item_type)
+        if not key or not is_complete(metadata):
+            return
+        metadata = {f: metadata[f] for f in METADATA_FIELDS}
+        self._entries[key] = (item_type, metadata)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO item_metadata (key, item_type, metadata, source, updated) VALUES (?, ?, ?, ?, ?)",
+            (key, item_type, json.dumps(metadata), source, time.time()),
+        )
+
+    def known_types(self, limit: int) -> list[str]:
+        """Display names of stored types, most requested first."""
+        keys = sorted(self._entries, key=lambda k: -self.hits[k])[:limit]
+        return [self._entries[k][0] for k in keys]
@@ -0,0 +1,82 @@
+"""
+Bounded image decode and per-backend downscaling.
+
+Uploads are read with a hard size limit, JPEGs are decoded in draft
+(reduced-resolution) mode, and the result is resized once for the local
+detector and once, smaller and re-encoded, for the Gemini payload.
+"""
+import io
+from dataclasses import dataclass
+
+from PIL import Image, ImageOps
+
+READ_CHUNK_BYTES = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the configured byte limit."""
+
+
+@dataclass
+class PreparedImage:
+    image: Image.Image   # RGB, longest side <= the detector input size
+    gemini_jpeg: bytes   # Smaller JPEG payload for Gemini
+    scale: float         # Multiply `image` coordinates by this to get original pixels
+    original_size: tuple[int, int]
+
+
+async def read_upload(upload, max_bytes: int) -> bytes:
+    """Reads an UploadFile, refusing anything larger than `max_bytes`."""
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLarge(f"Upload is {upload.size} bytes (limit {max_bytes})")
+    buf = bytearray()
+    while chunk := await upload.read(READ_CHUNK_BYTES):
+        buf.extend(chunk)
+        if len(buf) > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+    return bytes(buf)
+
+
+def _fit(image: Image.Image, max_side: int) -> Image.Image:
+    if max(image.size) <= max_side:
+        return image
+    resized = image.copy()
+    resized.thumbnail((max_side, max_side), Image.BILINEAR)
+    return resized
+
+
+def prepare_image(data: bytes, detector_size: int = 640, gemini_size: int = 512,
+                  gemini_quality: int = 80, max_pixels: int = 40_000_000) -> PreparedImage:
+    """Decodes and downsizes an upload for both backends (CPU bound, run in a thread)."""
+    img = Image.open(io.BytesIO(data))
+    if img.width * img.height > max_pixels:
+        raise ValueError(f"Image too large: {img.width}x{img.height}")
+    original_size = img.size
+    if img.getexif().get(0x0112, 1) in (5, 6, 7, 8):  # EXIF orientation rotates by 90°
+        original_size = original_size[::-1]
+
+    target = max(detector_size, gemini_size)
+    # JPEG only: let libjpeg decode at 1/2, 1/4 or 1/8 scale when that still covers the target
+    img.draft("RGB", (target, target))
+    img = ImageOps.exif_transpose(img).convert("RGB")
+
+    detector_image = _fit(img, detector_size)
+    gemini_image = _fit(detector_image if detector_size >= gemini_size else img, gemini_size)
+    buf = io.BytesIO()
+    gemini_image.save(buf, format="JPEG", quality=gemini_quality, optimize=True)
+
+    return PreparedImage(
+        image=detector_image,
+        gemini_jpeg=buf.getvalue(),
+        scale=original_size[0] / detector_image.width,
+        original_size=original_size,
+    )
+
+
+def decode_thumbnail(data: bytes, max_side: int = 64) -> Image.Image:
+    """Cheap small decode (JPEG draft mode) for frame hashing and quality checks."""
+    img = Image.open(io.BytesIO(data))
+    img.draft("RGB", (max_side, max_side))
+    img = img.convert("RGB")
+    img.thumbnail((max_side, max_side), Image.BILINEAR)
+    return img
@@ -0,0 +1,70 @@
+"""
+Warm-up state tracking for the detection backends (reported by /ready).
+"""
+import asyncio
+import time
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+UNAVAILABLE = "unavailable"
+DISABLED = "disabled"
+
+
+class BackendStatus:
+    def __init__(self, name: str):
+        self.name = name
+        self.state = PENDING
+        self.detail = ""
+        self.changed_at = time.monotonic()
+        self._settled = asyncio.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    @property
+    def warming(self) -> bool:
+        return self.state in (PENDING, LOADING)
+
+    def set(self, state: str, detail: str = ""):
+        self.state = state
+        self.detail = detail
+        self.changed_at = time.monotonic()
+        if not self.warming:
+            self._settled.set()
+
+    async def wait(self):
+        await self._settled.wait()
+
+    def to_dict(self) -> dict:
+        return {"state": self.state, "detail": self.detail}
+
+
+def overall_state(statuses: list[BackendStatus]) -> str:
+    """READY once any backend is, LOADING while one may still be, otherwise UNAVAILABLE."""
+    if any(s.ready for s in statuses):
+        return READY
+    if any(s.warming for s in statuses):
+        return LOADING
+    return UNAVAILABLE
+
+
+async def wait_for_first_ready(statuses: list[BackendStatus], timeout: float):
+    """Returns once any backend is ready, all have settled, or `timeout` passes."""
+    if any(s.ready for s in statuses):
+        return
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    waiting = [s for s in statuses if s.warming]
+    while waiting and not any(s.ready for s in statuses):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return
+        tasks = [asyncio.create_task(s.wait()) for s in waiting]
+        try:
+            await asyncio.wait(tasks, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for t in tasks:
+                t.cancel()
+        waiting = [s for s in waiting if s.warming]
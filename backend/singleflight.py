@@ -0,0 +1,50 @@
+"""
+Single-flight request coalescing.
+
+Concurrent callers asking for the same key share one in-flight task and all
+receive its result (or exception). A caller that is cancelled (for example
+because its client disconnected) only stops waiting; the shared work is
+cancelled only when nobody is left waiting for it.
+"""
+import asyncio
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: dict[str, _Call] = {}
+        self.started = 0   # Underlying calls actually made
+        self.coalesced = 0  # Callers that joined an existing call
+
+    def __len__(self):
+        return len(self._calls)
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key, fn):
+        """Runs `fn()` (a coroutine function) once per key at a time and shares its result."""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.create_task(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _t, k=key, c=call: self._forget(k, c))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
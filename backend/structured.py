@@ -0,0 +1,90 @@
+"""
+Structured (JSON) output helpers.
+
+Fast JSON encode/decode (orjson when installed, the standard library
+otherwise), a one-pass parser for model answers, and conversion of pydantic
+models into the OpenAPI-subset `responseSchema` that Gemini's JSON mode takes.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up
+    orjson = None
+
+BIN_NAMES = ["Recycle", "Organic", "Hazardous", "Landfill"]
+BIN_ENUM = {"type": "STRING", "format": "enum", "enum": BIN_NAMES}
+
+_GEMINI_TYPES = {
+    "string": "STRING", "integer": "INTEGER", "number": "NUMBER",
+    "boolean": "BOOLEAN", "array": "ARRAY", "object": "OBJECT",
+}
+
+
+def loads(data):
+    """Parses JSON from str or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
+def parse_json(text: str) -> dict:
+    """
+    Parses a model answer. JSON mode returns bare JSON, so the first attempt
+    normally succeeds; otherwise the outermost {...} is cut out of the text
+    (code fences, chatty preambles). Raises ValueError when neither works.
+    """
+    try:
+        return loads(text)
+    except ValueError:
+        start, end = text.find("{"), text.rfind("}")
+        if start == -1 or end <= start:
+            raise ValueError(f"No JSON object in model answer: {text[:80]!r}")
+        return loads(text[start:end + 1])
+
+
+def _convert(prop: dict) -> dict:
+    # Optional[X] comes out of pydantic as anyOf [X, null]
+    if "anyOf" in prop:
+        options = [p for p in prop["anyOf"] if p.get("type") != "null"]
+        converted = _convert(options[0])
+        if len(options) < len(prop["anyOf"]):
+            converted["nullable"] = True
+        return converted
+    schema = {"type": _GEMINI_TYPES[prop.get("type", "string")]}
+    if "enum" in prop:
+        schema.update(format="enum", enum=[str(v) for v in prop["enum"]])
+    if schema["type"] == "ARRAY" and "items" in prop:
+        schema["items"] = _convert(prop["items"])
+    return schema
+
+
+def gemini_schema(model_cls, exclude=(), overrides=None, optional=()) -> dict:
+    """
+    responseSchema for a flat pydantic model: uppercase types, every kept field
+    required (unless listed in `optional`), in declaration order. Nested models
+    and free-form dicts need an entry in `overrides` (field name -> schema).
+    """
+    overrides = overrides or {}
+    properties = {}
+    for name, prop in model_cls.model_json_schema()["properties"].items():
+        if name in exclude:
+            continue
+        properties[name] = overrides.get(name) or _convert(prop)
+    return {
+        "type": "OBJECT",
+        "properties": properties,
+        "required": [name for name in properties if name not in optional],
+        "propertyOrdering": list(properties),
+    }
+
+
+def json_mode(schema: dict) -> dict:
+    """generationConfig asking for JSON that matches `schema`."""
+    return {"responseMimeType": "application/json", "responseSchema": schema}
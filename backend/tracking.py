@@ -0,0 +1,103 @@
+"""
+Lightweight cross-frame tracker for live scanning.
+
+Detections from successive keyframes are matched to existing tracks by IoU,
+falling back to centroid distance (and to item type for Gemini results, which
+carry no box), so each physical item keeps a stable `id` across frames.
+"""
+from dataclasses import dataclass
+
+
+@dataclass
+class Track:
+    track_id: int
+    item: object  # DetectedItem
+    missed: int = 0
+
+
+def _xyxy(item):
+    b = item.bbox
+    return b.x, b.y, b.x + b.w, b.y + b.h
+
+
+def _has_box(item) -> bool:
+    return item.bbox.w > 0 and item.bbox.h > 0
+
+
+def iou(a, b) -> float:
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def centroid_distance(a, b) -> float:
+    """Distance between box centres, relative to the larger box's diagonal."""
+    dx = (a[0] + a[2] - b[0] - b[2]) / 2
+    dy = (a[1] + a[3] - b[1] - b[3]) / 2
+    scale = max(((a[2] - a[0]) ** 2 + (a[3] - a[1]) ** 2) ** 0.5,
+                ((b[2] - b[0]) ** 2 + (b[3] - b[1]) ** 2) ** 0.5, 1.0)
+    return (dx * dx + dy * dy) ** 0.5 / scale
+
+
+class ItemTracker:
+    def __init__(self, iou_threshold: float = 0.3, max_centroid_distance: float = 0.5, max_missed: int = 2):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.max_missed = max_missed
+        self.tracks: list[Track] = []
+        self._next_id = 1
+
+    def _score(self, track: Track, item) -> float:
+        """Match quality in [0, 2]; 0 means no match."""
+        same_type = track.item.itemType.lower() == item.itemType.lower()
+        if not (_has_box(track.item) and _has_box(item)):
+            return 1.0 if same_type else 0.0
+        a, b = _xyxy(track.item), _xyxy(item)
+        overlap = iou(a, b)
+        if overlap >= self.iou_threshold:
+            return 1.0 + overlap
+        if same_type:
+            distance = centroid_distance(a, b)
+            if distance <= self.max_centroid_distance:
+                return 1.0 - distance / self.max_centroid_distance * 0.5
+        return 0.0
+
+    def update(self, items: list) -> list:
+        """Feeds one keyframe's detections; returns them re-numbered with stable ids."""
+        pairs = sorted(
+            ((self._score(t, item), ti, di) for ti, t in enumerate(self.tracks) for di, item in enumerate(items)),
+            reverse=True,
+        )
+        matched_tracks, matched_items = set(), {}
+        for score, ti, di in pairs:
+            if score <= 0:
+                break
+            if ti in matched_tracks or di in matched_items:
+                continue
+            matched_tracks.add(ti)
+            matched_items[di] = self.tracks[ti]
+
+        survivors = []
+        for ti, track in enumerate(self.tracks):
+            if ti not in matched_tracks:
+                track.missed += 1
+                if track.missed <= self.max_missed:
+                    survivors.append(track)
+
+        for di, item in enumerate(items):
+            track = matched_items.get(di)
+            if track is None:
+                track = Track(self._next_id, item)
+                self._next_id += 1
+            track.item = item.model_copy(update={"id": track.track_id})
+            track.missed = 0
+            survivors.append(track)
+
+        self.tracks = sorted(survivors, key=lambda t: t.track_id)
+        return self.items()
+
+    def items(self) -> list:
+        """Items currently tracked (including ones briefly missed on the last keyframe)."""
+        return [t.item for t in self.tracks]
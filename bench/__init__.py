@@ -0,0 +1,7 @@
+"""
+Offline load-test and benchmark suite.
+
+`python -m bench.run` starts a local Gemini stand-in and the backend pointed at
+it, drives /detect and /chat at fixed concurrency levels and writes the results
+to bench/results/. No network access is needed.
+"""
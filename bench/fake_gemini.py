@@ -0,0 +1,142 @@
+"""
+Local stand-in for the Generative Language REST API.
+
+Serves just enough of /v1beta for the backend: model listing,
+`:generateContent` and `:streamGenerateContent?alt=sse`. Latency, the share of
+429 responses and the share of malformed (non-JSON) answers are configurable,
+so key rotation and parse fallbacks can be exercised under load.
+
+    python -m bench.fake_gemini --port 8765 --latency-ms 800 --rate-429 0.05 --malformed 0.02
+"""
+import argparse
+import asyncio
+import json
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+MODELS = ["models/gemini-1.5-flash", "models/gemini-1.5-pro"]
+
+DETECTION_ANSWERS = [
+    {"itemType": "Plastic Bottle", "bin": "Recycle", "contaminated": False, "confidence": 0.94},
+    {"itemType": "Banana Peel", "bin": "Organic", "contaminated": False, "confidence": 0.91},
+    {"itemType": "AA Battery", "bin": "Hazardous", "contaminated": False, "confidence": 0.88},
+    {"itemType": "Chip Packet", "bin": "Landfill", "contaminated": True, "confidence": 0.82},
+]
+METADATA = {
+    "transformation": "Becomes new packaging after processing.",
+    "impact": "Recycling one item saves enough energy to power a bulb for hours.",
+    "fun_fact": "Most of this material can be recycled many times.",
+}
+CHAT_ANSWER = {
+    "response": "Rinse it and put it in the recycling bin.",
+    "binSuggestion": "Recycle",
+}
+
+
+class FakeGeminiConfig:
+    def __init__(self, latency_ms: float = 800.0, jitter_ms: float = 200.0, rate_429: float = 0.0,
+                 malformed: float = 0.0, stream_chunks: int = 6, seed: int | None = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.malformed = malformed
+        self.stream_chunks = max(1, stream_chunks)
+        self.random = random.Random(seed)
+        self.requests = 0
+
+    def delay(self) -> float:
+        return max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+
+
+def _candidate(text: str) -> dict:
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}]}
+
+
+def _rate_limited() -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).", "status": "RESOURCE_EXHAUSTED"}},
+    )
+
+
+def _answer_text(config: FakeGeminiConfig, body: dict) -> str:
+    parts = body.get("contents", [{}])[0].get("parts", [])
+    has_image = any("inline_data" in p or "inlineData" in p for p in parts)
+    if config.random.random() < config.malformed:
+        return 'Sure! Here is the result: {"items": [{"itemType": "Plastic'  # Truncated JSON
+    if has_image:
+        count = config.random.randint(1, 3)
+        items = [dict(item, metadata=METADATA) for item in config.random.sample(DETECTION_ANSWERS, count)]
+        if body.get("generationConfig", {}).get("responseMimeType") == "application/json":
+            return json.dumps({"items": items})
+        return "```json\n" + json.dumps({"items": items}) + "\n```"  # Free-form answers come fenced
+    return json.dumps(CHAT_ANSWER)
+
+
+def create_app(config: FakeGeminiConfig) -> FastAPI:
+    app = FastAPI(title="Fake Gemini")
+    app.state.config = config
+
+    @app.get("/v1beta/models")
+    async def list_models():
+        return {"models": [{"name": name, "supportedGenerationMethods": ["generateContent"]} for name in MODELS]}
+
+    @app.post("/v1beta/models/{target}")
+    async def generate(target: str, request: Request):
+        model, _, method = target.partition(":")
+        if f"models/{model}" not in MODELS:
+            return JSONResponse(status_code=404, content={"error": {"code": 404, "message": f"models/{model} is not found", "status": "NOT_FOUND"}})
+        config.requests += 1
+        if config.random.random() < config.rate_429:
+            return _rate_limited()
+        body = await request.json()
+        text = _answer_text(config, body)
+
+        if method == "generateContent":
+            await asyncio.sleep(config.delay())
+            return _candidate(text)
+
+        if method == "streamGenerateContent":
+            if "BIN:" not in text:
+                text = "Rinse it and put it in the recycling bin.\nBIN: Recycle"
+            step = max(1, len(text) // config.stream_chunks)
+            pieces = [text[i:i + step] for i in range(0, len(text), step)]
+            per_chunk = config.delay() / len(pieces)
+
+            async def events():
+                for piece in pieces:
+                    await asyncio.sleep(per_chunk)
+                    yield f"data: {json.dumps(_candidate(piece))}\r\n\r\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return JSONResponse(status_code=400, content={"error": {"code": 400, "message": f"Unknown method {method}", "status": "INVALID_ARGUMENT"}})
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": config.requests}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=200.0, help="Standard deviation of the latency")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Share of calls answered with 429")
+    parser.add_argument("--malformed", type=float, default=0.0, help="Share of answers that are not valid JSON")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = FakeGeminiConfig(args.latency_ms, args.jitter_ms, args.rate_429, args.malformed, seed=args.seed)
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark images: seeded synthetic scenes at several resolutions, plus any
+fixture photos dropped into a directory.
+
+Every synthetic image is different (so the detection cache only hits when a
+scenario asks for repeats), but the set is identical from run to run.
+"""
+import io
+import os
+import random
+
+from PIL import Image, ImageDraw
+
+RESOLUTIONS = {
+    "qvga": (320, 240),
+    "vga": (640, 480),
+    "hd": (1280, 720),
+    "fhd": (1920, 1080),
+    "12mp": (4032, 3024),
+}
+FIXTURE_SUFFIXES = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def synthetic_jpeg(width: int, height: int, seed: int, quality: int = 90) -> bytes:
+    """A cluttered scene of coloured shapes on a noisy background."""
+    rng = random.Random(seed)
+    image = Image.effect_noise((width, height), 24).convert("RGB")
+    image = Image.blend(image, Image.new("RGB", (width, height), tuple(rng.randint(150, 240) for _ in range(3))), 0.7)
+    draw = ImageDraw.Draw(image)
+    for _ in range(rng.randint(3, 8)):
+        x0, y0 = rng.randint(0, width - 2), rng.randint(0, height - 2)
+        x1 = min(width, x0 + rng.randint(width // 10, width // 3))
+        y1 = min(height, y0 + rng.randint(height // 10, height // 3))
+        color = tuple(rng.randint(0, 255) for _ in range(3))
+        if rng.random() < 0.5:
+            draw.rectangle([x0, y0, x1, y1], fill=color)
+        else:
+            draw.ellipse([x0, y0, x1, y1], fill=color)
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def synthetic_set(resolution: str, count: int, seed: int = 0) -> list[tuple[str, bytes]]:
+    width, height = RESOLUTIONS[resolution]
+    return [(f"{resolution}_{i}.jpg", synthetic_jpeg(width, height, seed * 100_003 + i)) for i in range(count)]
+
+
+def fixture_set(directory: str) -> list[tuple[str, bytes]]:
+    """All images in `directory` (non-recursive), sorted by name."""
+    images = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(FIXTURE_SUFFIXES):
+            with open(os.path.join(directory, name), "rb") as f:
+                images.append((name, f.read()))
+    return images
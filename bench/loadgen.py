@@ -0,0 +1,91 @@
+"""
+Closed-loop load generator: `concurrency` workers each send their next request
+as soon as the previous one finishes, until `requests` have been sent.
+"""
+import asyncio
+import itertools
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+
+import httpx
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Linear-interpolated percentile of an already sorted list (q in 0..100)."""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    endpoint: str
+    concurrency: int
+    requests: int
+    errors: int
+    duration_s: float
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    max_ms: float
+    statuses: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def summarize(name, endpoint, concurrency, latencies, statuses, errors, duration) -> ScenarioResult:
+    latencies = sorted(latencies)
+    ms = lambda q: round(percentile(latencies, q) * 1000, 2)
+    return ScenarioResult(
+        name=name,
+        endpoint=endpoint,
+        concurrency=concurrency,
+        requests=len(latencies),
+        errors=errors,
+        duration_s=round(duration, 3),
+        rps=round(len(latencies) / duration, 2) if duration else 0.0,
+        p50_ms=ms(50),
+        p95_ms=ms(95),
+        p99_ms=ms(99),
+        mean_ms=round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        max_ms=round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        statuses={str(k): v for k, v in sorted(statuses.items())},
+    )
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, endpoint: str, make_request,
+                       concurrency: int, requests: int) -> ScenarioResult:
+    """
+    `make_request(i)` returns the keyword arguments for `client.post` for the
+    i-th request. Transport failures count as errors with status "exception".
+    """
+    counter = itertools.count()
+    latencies, statuses = [], Counter()
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while (i := next(counter)) < requests:
+            start = time.perf_counter()
+            try:
+                response = await client.post(endpoint, **make_request(i))
+                await response.aread()
+                statuses[response.status_code] += 1
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                statuses["exception"] += 1
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(name, endpoint, concurrency, latencies, statuses, errors, time.perf_counter() - start)
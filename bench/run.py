@@ -0,0 +1,235 @@
+"""
+Runs the offline benchmark and records the results.
+
+Starts the fake Gemini server and the backend (pointed at it through
+GEMINI_API_BASE), drives /detect and /chat at each concurrency level, writes
+bench/results/<timestamp>.json and compares it with the previous run.
+
+    python -m bench.run                                   # defaults
+    python -m bench.run -c 1,8,32 -n 200 --resolutions vga,12mp
+    python -m bench.run --rate-429 0.1 --malformed 0.05   # degraded upstream
+    python -m bench.run --fixtures photos/ --label onnx-int8
+    python -m bench.run --backend-url http://127.0.0.1:8000   # already running server
+
+Detector settings (DETECTOR_BACKEND, ...) are passed through from the
+environment. Exits with status 1 on a regression when --fail-on-regression is set.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.images import fixture_set, synthetic_set
+from bench.loadgen import run_scenario
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT_DIR, "bench", "results")
+
+FAST_PATH_QUERIES = [
+    "where do batteries go",
+    "can I recycle a plastic bottle",
+    "banana peel?",
+    "which bin for pizza boxes",
+]
+GEMINI_QUERY = "What is the most sustainable way to deal with a broken ceramic mug and its packaging? (#{i})"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start(cmd: list[str], env: dict, log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w")
+    return subprocess.Popen(cmd, cwd=ROOT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_until(url: str, timeout: float, ok=(200,)):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code in ok:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise TimeoutError(f"{url} not ready after {timeout:.0f}s")
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_all(args, base_url: str) -> list[dict]:
+    image_sets = {res: synthetic_set(res, 1 if args.repeat_images else args.unique_images, seed=args.seed)
+                  for res in args.resolutions}
+    if args.fixtures:
+        image_sets["fixtures"] = fixture_set(args.fixtures)
+
+    results = []
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        for concurrency in args.concurrency:
+            if "detect" in args.endpoints:
+                for name, images in image_sets.items():
+                    if not images:
+                        continue
+                    make = lambda i, images=images: {"files": {"image": (images[i % len(images)][0], images[i % len(images)][1], "image/jpeg")}}
+                    results.append(await run_scenario(client, f"detect_{name}", "/detect", make, concurrency, args.requests))
+                    print_result(results[-1])
+            if "chat" in args.endpoints:
+                make = lambda i: {"json": {"query": FAST_PATH_QUERIES[i % len(FAST_PATH_QUERIES)]}}
+                results.append(await run_scenario(client, "chat_fast_path", "/chat", make, concurrency, args.requests))
+                print_result(results[-1])
+                make = lambda i: {"json": {"query": GEMINI_QUERY.format(i=i)}}
+                results.append(await run_scenario(client, "chat_gemini", "/chat", make, concurrency, args.requests))
+                print_result(results[-1])
+    return [r.to_dict() for r in results]
+
+
+def print_result(r):
+    print(f"  {r.name:<18} c={r.concurrency:<3} n={r.requests:<5} err={r.errors:<4} "
+          f"rps={r.rps:<8} p50={r.p50_ms:<9} p95={r.p95_ms:<9} p99={r.p99_ms} ms")
+
+
+def latest_result(exclude: str | None = None) -> str | None:
+    paths = sorted(p for p in glob.glob(os.path.join(RESULTS_DIR, "*.json")) if p != exclude)
+    return paths[-1] if paths else None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Scenarios whose p95 grew, or whose throughput fell, by more than `threshold`."""
+    previous = {(s["name"], s["concurrency"]): s for s in baseline["scenarios"]}
+    regressions = []
+    print(f"\n📊 Compared with {baseline.get('label') or baseline['timestamp']} ({baseline.get('commit')})")
+    for s in current["scenarios"]:
+        old = previous.get((s["name"], s["concurrency"]))
+        if old is None:
+            continue
+        p95_change = (s["p95_ms"] - old["p95_ms"]) / old["p95_ms"] if old["p95_ms"] else 0.0
+        rps_change = (s["rps"] - old["rps"]) / old["rps"] if old["rps"] else 0.0
+        flag = ""
+        if p95_change > threshold or rps_change < -threshold:
+            flag = "  ⚠️ regression"
+            regressions.append(f"{s['name']} c={s['concurrency']}")
+        print(f"  {s['name']:<18} c={s['concurrency']:<3} p95 {old['p95_ms']} -> {s['p95_ms']} ms ({p95_change:+.0%}), "
+              f"rps {old['rps']} -> {s['rps']} ({rps_change:+.0%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-c", "--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("-n", "--requests", type=int, default=50, help="Requests per scenario and level")
+    parser.add_argument("--endpoints", default="detect,chat")
+    parser.add_argument("--resolutions", default="vga,hd,12mp", help="Synthetic image sizes (qvga, vga, hd, fhd, 12mp)")
+    parser.add_argument("--unique-images", type=int, default=64, help="Distinct images per resolution")
+    parser.add_argument("--repeat-images", action="store_true", help="Send one image per resolution (cache hits)")
+    parser.add_argument("--fixtures", help="Directory of real photos to add as a scenario")
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Fake Gemini mean latency")
+    parser.add_argument("--jitter-ms", type=float, default=200.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--malformed", type=float, default=0.0)
+    parser.add_argument("--keys", type=int, default=4, help="Number of fake API keys")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request client timeout")
+    parser.add_argument("--backend-url", help="Benchmark an already running backend instead of starting one")
+    parser.add_argument("--label", default="", help="Free-form name stored with the results")
+    parser.add_argument("--baseline", help="Results file to compare with (default: the previous run)")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative change that counts as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    args.endpoints = set(args.endpoints.split(","))
+    args.resolutions = [r for r in args.resolutions.split(",") if r]
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    processes = []
+    try:
+        base_url = args.backend_url
+        if base_url is None:
+            gemini_port, backend_port = free_port(), free_port()
+            processes.append(start(
+                [sys.executable, "-m", "bench.fake_gemini", "--port", str(gemini_port),
+                 "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+                 "--rate-429", str(args.rate_429), "--malformed", str(args.malformed), "--seed", str(args.seed)],
+                dict(os.environ), os.path.join(RESULTS_DIR, f"{stamp}.fake_gemini.log"),
+            ))
+            wait_until(f"http://127.0.0.1:{gemini_port}/v1beta/models", 30)
+
+            env = dict(os.environ)
+            env.update(
+                GEMINI_API_BASE=f"http://127.0.0.1:{gemini_port}/v1beta",
+                GEMINI_API_KEY=",".join(f"bench-key-{i + 1}" for i in range(args.keys)),
+                GEMINI_KEY_RPM=env.get("GEMINI_KEY_RPM", "100000"),
+                GEMINI_KEY_BURST=env.get("GEMINI_KEY_BURST", "1000"),
+                GEMINI_KEY_COOLDOWN_S=env.get("GEMINI_KEY_COOLDOWN_S", "0.5"),
+                # Every virtual user connects from 127.0.0.1 and resends the same few images:
+                # per-client limits and the frame gate would measure 429s and rejections instead
+                CLIENT_RATE_PER_MINUTE=env.get("CLIENT_RATE_PER_MINUTE", "0"),
+                FRAME_GATE=env.get("FRAME_GATE", "0"),
+            )
+            processes.append(start(
+                [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(backend_port), "--log-level", "warning"],
+                env, os.path.join(RESULTS_DIR, f"{stamp}.backend.log"),
+            ))
+            base_url = f"http://127.0.0.1:{backend_port}"
+            wait_until(f"{base_url}/ready", 180)
+
+        print(f"🏁 Benchmarking {base_url}")
+        scenarios = asyncio.run(run_all(args, base_url))
+    finally:
+        for p in processes:
+            p.terminate()
+        for p in processes:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+    result = {
+        "timestamp": stamp,
+        "label": args.label,
+        "commit": git_commit(),
+        "config": {
+            "concurrency": args.concurrency, "requests": args.requests, "resolutions": args.resolutions,
+            "unique_images": 1 if args.repeat_images else args.unique_images, "fixtures": args.fixtures,
+            "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "rate_429": args.rate_429,
+            "malformed": args.malformed, "keys": args.keys, "backend_url": args.backend_url,
+            "detector_backend": os.getenv("DETECTOR_BACKEND", "ultralytics"),
+        },
+        "scenarios": scenarios,
+    }
+    path = os.path.join(RESULTS_DIR, f"{stamp}.json")
+    baseline_path = args.baseline or latest_result(exclude=path)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\n💾 Results written to {os.path.relpath(path, ROOT_DIR)}")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare(result, json.load(f), args.threshold)
+        if regressions and args.fail_on_regression:
+            print(f"❌ Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from backend.admission import AdmissionQueue, ClientLimiter, QueueFull, RateLimited, client_address, parse_networks
+
+
+def test_queue_runs_up_to_concurrency_then_waits_in_priority_order():
+    async def main():
+        queue = AdmissionQueue("test", concurrency=1, max_waiting=3)
+        order = []
+        gate = asyncio.Event()
+
+        async def job(name, priority):
+            async with queue.slot(priority):
+                order.append(name)
+                await gate.wait()
+
+        tasks = [asyncio.create_task(job("first", 1))]
+        await asyncio.sleep(0)
+        for name, priority in (("bulk", 1), ("interactive", 0), ("bulk2", 1)):
+            tasks.append(asyncio.create_task(job(name, priority)))
+        await asyncio.sleep(0)
+        assert queue.stats() == {"running": 1, "waiting": 3, "rejected": 0}
+        gate.set()
+        await asyncio.gather(*tasks)
+        return order, queue
+
+    order, queue = asyncio.run(main())
+    assert order == ["first", "interactive", "bulk", "bulk2"]
+    assert (queue.running, queue.waiting) == (0, 0)
+
+
+def test_full_queue_refuses_or_evicts_lower_priority():
+    async def main():
+        queue = AdmissionQueue("test", concurrency=1, max_waiting=1)
+        await queue.acquire()
+        bulk = asyncio.create_task(queue.acquire(priority=1))
+        await asyncio.sleep(0)
+        assert queue.full()
+        with pytest.raises(QueueFull) as refused:
+            await queue.acquire(priority=1)  # Does not outrank the waiter
+        assert refused.value.retry_after >= 1
+        interactive = asyncio.create_task(queue.acquire(priority=0))
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFull):
+            await bulk  # Pushed out
+        queue.release()
+        await interactive
+        return queue
+
+    assert asyncio.run(main()).stats() == {"running": 1, "waiting": 0, "rejected": 2}
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        queue = AdmissionQueue("test", concurrency=1, max_waiting=2)
+        await queue.acquire()
+        waiter = asyncio.create_task(queue.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        queue.release()
+        return queue
+
+    assert asyncio.run(main()).stats() == {"running": 0, "waiting": 0, "rejected": 0}
+
+
+def test_client_limiter_buckets_are_per_client():
+    limiter = ClientLimiter(rate_per_minute=60, burst=2)
+    limiter.check("a")
+    limiter.check("a")
+    with pytest.raises(RateLimited) as limited:
+        limiter.check("a")
+    assert limited.value.retry_after == 1
+    limiter.check("b")
+    assert limiter.limited == 1
+
+
+def test_client_limiter_disabled_and_bounded():
+    ClientLimiter(rate_per_minute=0, burst=1).check("a", cost=100)
+    limiter = ClientLimiter(rate_per_minute=60, burst=1, max_clients=2)
+    for client in ("a", "b", "c"):
+        limiter.check(client)
+    assert list(limiter._buckets) == ["b", "c"]
+
+
+TRUSTED = parse_networks("10.0.0.0/8, 127.0.0.1")
+
+
+@pytest.mark.parametrize("peer, forwarded, expected", [
+    ("203.0.113.5", None, "203.0.113.5"),
+    ("203.0.113.5", "1.2.3.4", "203.0.113.5"),              # Untrusted peer: header ignored
+    ("10.0.0.2", "1.2.3.4", "1.2.3.4"),
+    ("10.0.0.2", "6.6.6.6, 1.2.3.4", "1.2.3.4"),             # Client-supplied hops are skipped
+    ("10.0.0.2", "6.6.6.6, 1.2.3.4, 10.0.0.9", "1.2.3.4"),   # Through two trusted proxies
+    ("127.0.0.1", "10.0.0.3, 10.0.0.9", "10.0.0.3"),
+    (None, "1.2.3.4", "unknown"),
+])
+def test_client_address(peer, forwarded, expected):
+    assert client_address(peer, forwarded, TRUSTED) == expected
+
+
+def test_client_limiter_charges_the_full_cost():
+    limiter = ClientLimiter(rate_per_minute=60, burst=5)
+    limiter.check("a", cost=4)
+    with pytest.raises(RateLimited) as limited:
+        limiter.check("a", cost=3)
+    assert limited.value.retry_after == 2  # Waits for the whole cost, not a clamped one
+    with pytest.raises(ValueError):
+        limiter.check("a", cost=200)
@@ -0,0 +1,54 @@
+import json
+
+from backend.chat_stream import BinLineFilter, parse_bin, sse_event
+
+
+def run(chunks):
+    f = BinLineFilter()
+    shown = "".join(f.feed(c) for c in chunks) + f.finish()
+    return f, shown
+
+
+def test_bin_line_is_held_back():
+    f, shown = run(["Rinse it and ", "put it out.\n", "BIN: Recycle"])
+    assert shown == "Rinse it and put it out.\n"
+    assert f.bin_line == "BIN: Recycle"
+    assert f.text == shown
+
+
+def test_marker_split_across_chunks():
+    f, shown = run(["Compost it.\nB", "I", "N: Org", "anic\n"])
+    assert shown == "Compost it.\n"
+    assert parse_bin(f.bin_line) == "Organic"
+
+
+def test_text_is_forwarded_without_waiting_for_newline():
+    f = BinLineFilter()
+    assert f.feed("Batteries are hazardous") == "Batteries are hazardous"
+    assert f.feed(" waste. BIN: not a marker") == " waste. BIN: not a marker"
+    assert f.finish() == ""
+    assert f.bin_line is None
+
+
+def test_prefix_that_is_not_the_marker_is_released():
+    f = BinLineFilter()
+    assert f.feed("B") == ""
+    assert f.feed("ottles go in Recycle") == "Bottles go in Recycle"
+
+
+def test_missing_marker_keeps_all_text():
+    f, shown = run(["Bin", "s are emptied weekly."])
+    assert shown == "Bins are emptied weekly."
+    assert f.bin_line is None
+
+
+def test_parse_bin():
+    assert parse_bin("BIN: hazardous") == "Hazardous"
+    assert parse_bin("BIN: ???") == "Landfill"
+    assert parse_bin("", default="Recycle") == "Recycle"
+
+
+def test_sse_event():
+    event = sse_event("bin", {"bin": "Recycle"})
+    assert event.startswith("event: bin\ndata: ") and event.endswith("\n\n")
+    assert json.loads(event.split("data: ", 1)[1]) == {"bin": "Recycle"}
@@ -0,0 +1,77 @@
+import pytest
+
+from backend import circuit_breaker
+from backend.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def tripped(clock, **kwargs):
+    breaker = CircuitBreaker("test", failure_rate=0.5, window=4, min_calls=2, open_seconds=10, **kwargs)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_once_failure_rate_is_reached(clock):
+    breaker = CircuitBreaker("test", failure_rate=0.5, window=4, min_calls=4)
+    for outcome in (False, True, False):
+        breaker.allow()
+        breaker.record_failure() if outcome else breaker.record_success()
+    assert breaker.state == CLOSED  # Fewer than min_calls outcomes
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.opened == 1
+
+
+def test_half_open_admits_a_single_probe(clock):
+    breaker = tripped(clock)
+    assert breaker.retry_after() == pytest.approx(10)
+    clock.now += 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.available()
+    assert breaker.allow()
+    assert not breaker.available() and not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.to_dict()["failure_rate"] == 0.0
+
+
+def test_failed_probe_reopens_for_longer(clock):
+    breaker = tripped(clock, max_open_seconds=15)
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.retry_after() == pytest.approx(15)  # Doubled, capped
+    assert breaker.opened == 2
+
+
+def test_released_probe_frees_the_slot(clock):
+    breaker = tripped(clock)
+    clock.now += 10
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_late_failures_do_not_extend_an_open_breaker(clock):
+    breaker = tripped(clock)
+    clock.now += 5
+    breaker.record_failure()
+    assert breaker.retry_after() == pytest.approx(5)
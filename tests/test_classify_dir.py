@@ -0,0 +1,46 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend import classify_dir
+from backend.classify_dir import CsvSink, failed, restore
+
+
+class EmptyDetector:
+    """Stands in for backend.main: a working pipeline that finds nothing."""
+
+    async def run_detection(self, data, filename=""):
+        return SimpleNamespace(items=[], source="none")
+
+
+@pytest.fixture
+def images(tmp_path, monkeypatch):
+    root = tmp_path / "images"
+    root.mkdir()
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        (root / name).write_bytes(b"blank")
+    monkeypatch.setattr(classify_dir, "_main", EmptyDetector())
+    return root
+
+
+def test_empty_images_are_checkpointed(images, tmp_path):
+    results = asyncio.run(classify_dir.classify_all(str(images), ["a.jpg", "b.jpg", "c.jpg"]))
+    assert all(len(rows) == 1 and not failed(rows) for _, rows in results)
+
+    sink = CsvSink(str(tmp_path / "out.csv"), overwrite=False)
+    sink.open()
+    for _, rows in results:
+        sink.write(rows)
+    sink.close()
+
+    done, summary = restore(CsvSink(str(tmp_path / "out.csv"), overwrite=False))
+    assert done == {"a.jpg", "b.jpg", "c.jpg"}
+    assert (summary.images, summary.errors, sum(summary.items.values())) == (3, 0, 0)
+
+
+def test_read_errors_are_not_checkpointed(images):
+    path, rows = asyncio.run(classify_dir.classify_one(str(images), "missing.jpg"))
+    assert path == "missing.jpg"
+    assert failed(rows)
+    assert rows[0]["error"]
@@ -0,0 +1,89 @@
+import time
+
+from PIL import Image, ImageDraw
+
+from backend.detection_cache import DetectionCache, content_key, dhash
+
+
+class Result:
+    def __init__(self, name, size=10):
+        self.name = name
+        self.size = size
+
+    def model_dump_json(self):
+        return "x" * self.size
+
+
+def scene(item_box, color):
+    image = Image.new("RGB", (320, 240), (200, 200, 200))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([0, 180, 320, 240], fill=(90, 60, 30))  # Fixed counter top
+    draw.rectangle(item_box, fill=color)
+    return image
+
+
+def test_default_is_exact_match():
+    cache = DetectionCache()
+    cache.put(0b1111_0000, Result("bottle"))
+    assert cache.get(0b1111_0000).name == "bottle"
+    assert cache.get(0b0000_0000) is None  # 4 bits apart: a different item, not a hit
+
+
+def test_content_key_only_matches_identical_bytes():
+    assert content_key(b"same image") == content_key(b"same image")
+    assert content_key(b"same image") != content_key(b"same image ")
+
+
+def test_near_match_within_distance():
+    cache = DetectionCache(max_distance=2)
+    cache.put(0b1010, Result("can"))
+    assert cache.get(0b1011).name == "can"
+    assert cache.get(0b0101) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_near_match_picks_closest_entry():
+    cache = DetectionCache(max_distance=3)
+    cache.put(0b0000, Result("far"))
+    cache.put(0b0111, Result("near"))
+    assert cache.get(0b1111).name == "near"
+
+
+def test_dhash_size():
+    image = scene([100, 60, 160, 180], (30, 90, 200))
+    assert dhash(image) < 1 << 64
+    assert dhash(image, 16) < 1 << 256
+    assert dhash(image, 16) == dhash(image.copy(), 16)
+
+
+def test_different_items_on_same_background_get_different_keys():
+    bottle = scene([140, 40, 170, 180], (30, 90, 200))
+    banana = scene([120, 140, 200, 170], (230, 200, 40))
+    assert dhash(bottle, 16) != dhash(banana, 16)
+
+
+def test_ttl_expiry(monkeypatch):
+    cache = DetectionCache(ttl_seconds=10)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache.put(1, Result("a"))
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert cache.get(1) is None
+    assert len(cache) == 0
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = DetectionCache(max_entries=2)
+    cache.put(1, Result("a"))
+    cache.put(2, Result("b"))
+    cache.get(1)  # 2 is now least recently used
+    cache.put(3, Result("c"))
+    assert cache.get(2) is None and cache.get(1) is not None
+
+    cache = DetectionCache(max_bytes=25)
+    cache.put(1, Result("a", 10))
+    cache.put(2, Result("b", 10))
+    cache.put(3, Result("c", 10))
+    assert len(cache) == 2 and cache.stats()["bytes"] == 20
+    cache.put(4, Result("huge", 100))  # Larger than the whole cache: not stored
+    assert cache.get(4) is None
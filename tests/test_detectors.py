@@ -0,0 +1,52 @@
+import numpy as np
+from PIL import Image
+
+from backend.detectors import OnnxDetector, letterbox, nms
+
+
+def test_nms_suppresses_overlaps_and_keeps_order():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [50, 50, 60, 60], [0, 0, 10, 10]], dtype=np.float32)
+    scores = np.array([0.8, 0.9, 0.5, 0.3], dtype=np.float32)
+    assert nms(boxes, scores, 0.5).tolist() == [1, 2]
+
+
+def test_nms_keeps_boxes_below_threshold():
+    boxes = np.array([[0, 0, 10, 10], [5, 0, 15, 10]], dtype=np.float32)  # IoU 1/3
+    scores = np.array([0.9, 0.8], dtype=np.float32)
+    assert nms(boxes, scores, 0.5).tolist() == [0, 1]
+    assert nms(boxes, scores, 0.3).tolist() == [0]
+
+
+def test_letterbox_pads_to_square():
+    canvas, ratio, pad = letterbox(Image.new("RGB", (200, 100), (255, 0, 0)), 64)
+    assert canvas.shape == (64, 64, 3)
+    assert ratio == 0.32 and pad == (0, 16)
+    assert canvas[0, 0].tolist() == [114, 114, 114]
+    assert canvas[32, 32].tolist() == [255, 0, 0]
+
+
+def make_detector(num_classes=3):
+    detector = object.__new__(OnnxDetector)  # Post-processing only, no session
+    detector.input_size = 64
+    detector.conf_threshold = 0.25
+    detector.iou_threshold = 0.45
+    detector.max_detections = 100
+    return detector, num_classes
+
+
+def test_postprocess_is_class_aware_and_undoes_letterbox():
+    detector, num_classes = make_detector()
+    output = np.zeros((4 + num_classes, 4), dtype=np.float32)
+
+    def put(i, cx, cy, w, h, cls, score):
+        output[:4, i] = [cx, cy, w, h]
+        output[4 + cls, i] = score
+
+    put(0, 32, 32, 20, 20, 1, 0.9)
+    put(1, 33, 33, 20, 20, 1, 0.6)  # Same class, overlapping: suppressed
+    put(2, 33, 33, 20, 20, 2, 0.7)  # Other class at the same place: kept
+    put(3, 10, 10, 4, 4, 0, 0.1)    # Below the confidence threshold
+    result = detector._postprocess(output, ratio=0.5, pad=(0, 16), size=(128, 64))
+    assert result.class_ids.tolist() == [1, 2]
+    np.testing.assert_allclose(result.scores, [0.9, 0.7], rtol=1e-6)
+    np.testing.assert_allclose(result.boxes[0], [44, 12, 84, 52])  # (22,6)-(42,26) scaled back and clipped
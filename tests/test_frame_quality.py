@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from backend import frame_quality
+from backend.frame_quality import BLANK, BLURRY, TOO_BRIGHT, TOO_DARK, FrameGate, laplacian_variance
+
+
+def noise(seed=0, size=64):
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(30, 220, (size, size), dtype=np.uint8))
+
+
+def flat(value, size=64):
+    return Image.fromarray(np.full((size, size), value, dtype=np.uint8))
+
+
+def test_laplacian_variance_separates_sharp_from_smooth():
+    sharp = np.asarray(noise(), dtype=np.float32)
+    smooth = np.tile(np.linspace(0, 255, 64, dtype=np.float32), (64, 1))
+    assert laplacian_variance(sharp) > 100 * laplacian_variance(smooth) + 1
+
+
+@pytest.mark.parametrize("image, reason", [
+    (flat(5), TOO_DARK),
+    (flat(250), TOO_BRIGHT),
+    (flat(128), BLANK),
+    (Image.fromarray(np.tile(np.linspace(40, 200, 64).astype(np.uint8), (64, 1))), BLURRY),
+    (noise(), None),
+])
+def test_check(image, reason):
+    assert FrameGate().check(image) == reason
+
+
+def test_repeat_gets_the_remembered_result():
+    gate = FrameGate()
+    image = noise()
+    assert gate.recent_result("kiosk", image) is None
+    gate.remember("kiosk", image, "result")
+    assert gate.recent_result("kiosk", image) == "result"
+    assert gate.recent_result("kiosk", noise(seed=1)) is None  # Different frame
+    assert gate.recent_result("other", image) is None          # Different client
+
+
+def test_frames_are_only_repeated_after_being_remembered():
+    gate = FrameGate()
+    image = noise()
+    # A failed request is never remembered, so a retry is not treated as a repeat
+    assert gate.recent_result("kiosk", image) is None
+    assert gate.recent_result("kiosk", image) is None
+
+
+def test_repeats_expire_and_can_be_disabled(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(frame_quality.time, "monotonic", lambda: now[0])
+    gate = FrameGate(duplicate_window_s=3)
+    gate.remember("kiosk", noise(), "result")
+    now[0] += 4
+    assert gate.recent_result("kiosk", noise()) is None
+
+    disabled = FrameGate(duplicate_mad=0)
+    disabled.remember("kiosk", noise(), "result")
+    assert disabled.recent_result("kiosk", noise()) is None
+
+
+def test_clients_are_bounded_and_forgotten():
+    gate = FrameGate(max_clients=2)
+    for client in ("a", "b", "c"):
+        gate.remember(client, noise(), client)
+    assert gate.recent_result("a", noise()) is None
+    gate.forget("c")
+    assert gate.recent_result("c", noise()) is None
+    assert gate.recent_result("b", noise()) == "b"
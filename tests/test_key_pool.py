@@ -0,0 +1,82 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+from backend.key_pool import KeyPool, SharedKeyPool
+
+
+def test_acquire_prefers_least_loaded_key():
+    pool = KeyPool(2, requests_per_minute=60, burst=5)
+    first = pool.acquire()
+    second = pool.acquire()
+    assert {first.index, second.index} == {0, 1}
+    pool.release(first)
+    assert pool.acquire().index == first.index
+
+
+def test_budget_and_exclude():
+    pool = KeyPool(1, requests_per_minute=60, burst=1)
+    key = pool.acquire()
+    pool.release(key)
+    assert pool.acquire() is None  # Bucket is empty
+    assert KeyPool(1).acquire(exclude={0}) is None
+
+
+def test_cooldown_grows_and_invalid_keys_are_dropped():
+    pool = KeyPool(2, base_cooldown=5, max_cooldown=12)
+    key = pool.keys[0]
+    assert [pool.mark_rate_limited(key) for _ in range(3)] == [5, 10, 12]
+    assert pool.healthy_count() == 1
+    pool.mark_success(key)
+    assert key.consecutive_limits == 0
+    pool.mark_invalid(pool.keys[1], "bad key")
+    assert pool.usable_count() == 1
+    assert pool.acquire() is None
+
+
+def test_shared_pool_shares_state_between_instances(tmp_path):
+    path = str(tmp_path / "keys.sqlite")
+    a = SharedKeyPool(path, 2, requests_per_minute=60, burst=1)
+    b = SharedKeyPool(path, 2, requests_per_minute=60, burst=1)
+
+    key = a.acquire()
+    b.refresh()
+    assert b.keys[key.index].in_flight == 1
+    assert b.acquire().index != key.index  # The other key, and then no budget left
+    assert b.acquire() is None
+
+    a.release(key)
+    a.mark_invalid(a.keys[0], "bad key")
+    b.refresh()
+    assert b.keys[key.index].in_flight == 0
+    assert b.usable_count() == 1
+
+
+def test_in_flight_of_dead_processes_is_reaped(tmp_path):
+    path = str(tmp_path / "keys.sqlite")
+    pool = SharedKeyPool(path, 1)
+    child = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    dead_pid = int(child.stdout)
+    with pool._synced(write=True, load=False) as db:
+        db.execute("INSERT INTO key_in_flight (idx, pid, calls) VALUES (0, ?, 3)", (dead_pid,))
+        db.execute("INSERT INTO key_in_flight (idx, pid, calls) VALUES (0, ?, 1)", (os.getppid(),))
+
+    pool.refresh()
+    assert pool.keys[0].in_flight == 1  # Only the live process counts
+    pool.mark_success(pool.keys[0])
+    with pool._synced() as db:
+        pids = {pid for (pid,) in db.execute("SELECT pid FROM key_in_flight")}
+    assert pids == {os.getppid()}
+
+
+def test_run_moves_shared_writes_off_the_event_loop(tmp_path):
+    pool = SharedKeyPool(str(tmp_path / "keys.sqlite"), 1)
+
+    async def main():
+        key = await pool.run(pool.acquire, ())
+        await pool.run(pool.release, key)
+        return key
+
+    assert asyncio.run(main()).index == 0
+    assert asyncio.run(KeyPool(1).run(KeyPool(1).usable_count)) == 1
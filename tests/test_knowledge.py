@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from backend.knowledge import ItemIndex
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), "..", "backend", "data", "knowledge_items.json")
+
+# A slice of main.BIN_MAPPING, including the detector classes that double as everyday words
+BIN_MAPPING = {
+    "bottle": "Recycle", "wine glass": "Landfill", "cup": "Recycle", "book": "Recycle",
+    "banana": "Organic", "orange": "Organic", "food": "Organic",
+    "tie": "Landfill", "mouse": "Hazardous", "remote": "Hazardous", "tv": "Hazardous",
+}
+
+
+@pytest.fixture(scope="module")
+def index():
+    return ItemIndex.build(BIN_MAPPING, {"cup"}, {}, [DATA_FILE])
+
+
+@pytest.mark.parametrize("query", [
+    "how do I tie a garbage bag",
+    "I found a dead mouse",
+    "can I book a pickup for my old sofa",
+    "what goes in the orange bin",
+    "how can I reduce food waste",
+    "tell me about my tv show",
+])
+def test_no_answer_without_a_bin_question(index, query):
+    assert index.answer(query) is None
+
+
+@pytest.mark.parametrize("query, name, bin_name", [
+    ("where do batteries go", "battery", "Hazardous"),
+    ("can I recycle a plastic bottle", "plastic bottle", "Recycle"),
+    ("banana peel?", "food scrap", "Organic"),
+    ("which bin for pizza boxes", "pizza box", "Recycle"),
+    ("where do broken wine glasses go", "ceramic", "Landfill"),
+    ("which bin does an old computer mouse go in", "mouse", "Hazardous"),
+    ("can i recycle soda cans", "aluminium can", "Recycle"),
+])
+def test_answers_bin_questions(index, query, name, bin_name):
+    match = index.answer(query)
+    assert match is not None
+    assert (match.item.name, match.item.bin) == (name, bin_name)
+
+
+def test_mixed_bins_are_left_to_the_model(index):
+    assert index.answer("where do batteries and banana peels go") is None
+
+
+def test_long_queries_are_left_to_the_model(index):
+    assert index.answer("where do batteries go " + "please " * 10, max_words=12) is None
+
+
+def test_longest_phrase_wins(index):
+    assert index.answer("where does a coffee cup go").item.name == "coffee cup"
+
+
+def test_rinse_tip_only_for_containers(index):
+    assert "rinse" in index.format_answer(index.answer("where does a soda can go"))
+    assert "rinse" not in index.format_answer(index.answer("which bin for pizza boxes"))
+    assert "rinse" not in index.format_answer(index.answer("where does a paperback go"))
+
+
+def test_answer_names_the_item_asked_about(index):
+    answer = index.format_answer(index.answer("where does a wine glass go"))
+    assert answer.startswith("Wine glass goes in the Landfill bin.")
+
+
+def test_chat_and_detection_agree_on_every_detector_class(monkeypatch):
+    monkeypatch.setenv("METADATA_DB", "")
+    main = pytest.importorskip("backend.main")
+    for name in main.BIN_MAPPING:
+        match = main.item_index.answer(f"which bin for a {name}")
+        if match is not None:  # Ambiguous class names are only indexed under aliases
+            assert match.item.bin == main.get_bin_for_item(name), name
+    assert main.get_bin_for_item("wine glass") == main.item_index.answer("wine glass?").item.bin == "Landfill"
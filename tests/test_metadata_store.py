@@ -0,0 +1,32 @@
+import asyncio
+
+from backend.metadata_store import MetadataStore, is_complete
+
+META = {"transformation": "t", "impact": "i", "fun_fact": "f"}
+
+
+def test_cached_never_reads_the_database(tmp_path):
+    path = str(tmp_path / "meta.sqlite")
+    writer, reader = MetadataStore(path), MetadataStore(path)
+    writer.put("Plastic Bottle", META)
+    assert reader.cached("plastic bottles") is None  # Written by another process after start-up
+    assert reader.get("plastic bottles") == META      # Falls through to the database
+    assert reader.cached("Plastic Bottle") == META
+
+
+def test_incomplete_metadata_is_not_stored(tmp_path):
+    store = MetadataStore(str(tmp_path / "meta.sqlite"))
+    store.put("Can", {"transformation": "t"})
+    assert not is_complete({"transformation": "t"})
+    assert store.get("can") is None
+
+
+def test_calls_from_worker_threads(tmp_path):
+    store = MetadataStore(str(tmp_path / "meta.sqlite"))
+
+    async def main():
+        await asyncio.gather(*(asyncio.to_thread(store.put, f"item {i}", META) for i in range(8)))
+        return await asyncio.to_thread(store.get, "item 3")
+
+    assert asyncio.run(main()) == META
+    assert len(MetadataStore(store.path)) == 8
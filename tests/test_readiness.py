@@ -0,0 +1,25 @@
+from backend.readiness import DISABLED, LOADING, READY, UNAVAILABLE, BackendStatus, overall_state
+
+
+def statuses(*states):
+    result = []
+    for i, state in enumerate(states):
+        status = BackendStatus(f"backend{i}")
+        status.set(state)
+        result.append(status)
+    return result
+
+
+def test_ready_once_any_backend_is():
+    assert overall_state(statuses(UNAVAILABLE, READY)) == READY
+    assert overall_state(statuses(LOADING, READY)) == READY
+
+
+def test_loading_while_a_backend_may_still_come_up():
+    assert overall_state(statuses(DISABLED, LOADING)) == LOADING
+    assert overall_state([BackendStatus("gemini"), BackendStatus("yolo")]) == LOADING
+
+
+def test_unavailable_once_every_backend_has_settled_unusable():
+    assert overall_state(statuses(DISABLED, UNAVAILABLE)) == UNAVAILABLE
+    assert overall_state(statuses(DISABLED, DISABLED)) == UNAVAILABLE
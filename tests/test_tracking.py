@@ -0,0 +1,51 @@
+from pydantic import BaseModel
+
+from backend.tracking import ItemTracker, centroid_distance, iou
+
+
+class Box(BaseModel):
+    x: int
+    y: int
+    w: int
+    h: int
+
+
+class Item(BaseModel):
+    id: int = 0
+    itemType: str
+    bbox: Box
+
+
+def item(kind, x, y, w=40, h=40):
+    return Item(itemType=kind, bbox=Box(x=x, y=y, w=w, h=h))
+
+
+def test_iou_and_centroid_distance():
+    assert iou((0, 0, 10, 10), (0, 0, 10, 10)) == 1.0
+    assert iou((0, 0, 10, 10), (20, 20, 30, 30)) == 0.0
+    assert abs(iou((0, 0, 10, 10), (5, 0, 15, 10)) - 1 / 3) < 1e-9
+    assert centroid_distance((0, 0, 10, 10), (0, 0, 10, 10)) == 0.0
+
+
+def test_ids_stay_stable_while_items_move():
+    tracker = ItemTracker()
+    first = tracker.update([item("Bottle", 0, 0), item("Banana", 200, 200)])
+    assert [i.id for i in first] == [1, 2]
+    moved = tracker.update([item("Banana", 205, 210), item("Bottle", 8, 4)])
+    assert {i.itemType: i.id for i in moved} == {"Bottle": 1, "Banana": 2}
+
+
+def test_new_item_gets_new_id_and_lost_tracks_expire():
+    tracker = ItemTracker(max_missed=1)
+    tracker.update([item("Bottle", 0, 0)])
+    result = tracker.update([item("Can", 300, 300)])
+    assert {i.itemType: i.id for i in result} == {"Bottle": 1, "Can": 2}  # Bottle missed once, still shown
+    result = tracker.update([item("Can", 300, 300)])
+    assert [i.itemType for i in result] == ["Can"]
+
+
+def test_boxless_items_match_by_type():
+    tracker = ItemTracker()
+    tracker.update([item("Plastic Bottle", 0, 0, 0, 0)])
+    result = tracker.update([item("plastic bottle", 0, 0, 0, 0), item("Paper", 0, 0, 0, 0)])
+    assert {i.itemType: i.id for i in result} == {"plastic bottle": 1, "Paper": 2}